@@ -1,20 +1,37 @@
 import asyncio
+import concurrent.futures
+import heapq
 import json
 import re
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 import discord
-from discord.ext import tasks
+try:
+    from discord import ForumChannel
+except ImportError:  # discord.py < 2.0
+    ForumChannel = None
 import gspread
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from langgraph.graph import StateGraph, START, END
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 import sqlite3
+try:
+    # Optional: faster (de)serialization of the invoice_data column
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables
 load_dotenv()
@@ -63,12 +80,172 @@ class Config:
     reminder_interval_hours: int = 24
     max_reminders: int = 5
     approval_sla_hours: int = 24
+    # Most invoices processed per reminder tick; the rest stay due for the next tick
+    reminder_batch_size: int = 50
     # Fallback by channel name when ID is not accessible
     fallback_channel_name: Optional[str] = None
 
 from src.eth.etherscan_client import check_transaction_success, get_transaction_amount_eth
 
+# Payment reference detection, in priority order: an Ethereum tx hash, a labelled reference,
+# then a bare alphanumeric ID. Tried one at a time so a label always beats an earlier bare word
+_TX_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(0x[a-fA-F0-9]{64})',
+    r'TX[ID]?[:\s]+([A-Z0-9]{6,})',
+    r'TRANSACTION[ID]?[:\s]+([A-Z0-9]{6,})',
+    r'REF(?:ERENCE)?[:\s]+([A-Z0-9]{6,})',
+    r'PAYMENT[:\s]+([A-Z0-9]{6,})',
+    r'COMPLETED[:\s]+([A-Z0-9]{6,})',
+    r'([A-Z0-9]{8,64})',
+))
+_TX_HASH = re.compile(r'0x[a-fA-F0-9]{64}', re.IGNORECASE)
+# Substring match (e.g. "TXID:", "payments"), as a message only has to look like a payment
+_PAYMENT_KEYWORDS = ('TX', 'TRANSACTION', 'REF', 'PAYMENT', 'COMPLETED')
+
+def _has_payment_keyword(text: str) -> bool:
+    """True when the message mentions any payment keyword (case-insensitive substring)."""
+    text_upper = text.upper()
+    return any(k in text_upper for k in _PAYMENT_KEYWORDS)
+
+def _extract_transaction_id(text: str) -> Optional[str]:
+    """First hit of the highest-priority transaction-id pattern, or None."""
+    for pattern in _TX_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+# Constant skeleton of the approval-request embed; field values are str.format templates over invoice_data
+_EMBED_TEMPLATE = {
+    "title": "🧾 Invoice Approval Request",
+    "color": 0x3498db,
+    "fields": [
+        {
+            "name": "📋 Invoice Details",
+            "value": "**Number:** {Invoice Number}\n"
+                     "**Date:** {Invoice Date}\n"
+                     "**Amount:** {Total Amount} {Currency}",
+            "inline": False
+        },
+        {
+            "name": "🏦 Payment Details",
+            "value": "**Account Holder:** {Account Holder}\n"
+                     "**Bank:** {Bank Address}\n"
+                     "**Account:** {Account Number/IBAN}",
+            "inline": False
+        },
+        {
+            "name": "📊 Additional Info",
+            "value": "**Line Items:** {Line Items Count}\n"
+                     "**Submitted:** {Timestamp}",
+            "inline": False
+        },
+        {
+            "name": "⚡ Action Required",
+            "value": "Please respond with:\n"
+                     "• `APPROVE <cost_center>` to approve\n"
+                     "• `REJECT <reason>` to reject\n\n"
+                     "{role}",
+            "inline": False
+        }
+    ]
+}
+
+# Skeletons of the per-message embeds: constant title/color plus (field name, inline) pairs
+_EMBED_SKELETONS = {
+    "approved": {"title": "✅ Invoice Approved", "color": 0x27ae60, "fields": ()},
+    "rejected": {"title": "❌ Invoice Rejected", "color": 0xe74c3c, "fields": ()},
+    "payment_successful": {
+        "title": "✅ Payment Successful", "color": 0x27ae60,
+        "fields": (("Invoice Number", True), ("Transaction ID", False), ("Amount (ETH)", True), ("Status", True)),
+    },
+    "payment_failed": {
+        "title": "❌ Payment Failed", "color": 0xe74c3c,
+        "fields": (("Invoice Number", True), ("Transaction ID", False), ("Amount (ETH)", True), ("Status", True)),
+    },
+    "payment_confirmed": {
+        "title": "✅ Payment Confirmed", "color": 0x27ae60,
+        "fields": (("Invoice Number", True), ("Transaction ID", True), ("Status", True)),
+    },
+    "reminder": {
+        "title": "⏰ Approval Reminder", "color": 0xf39c12,
+        "fields": (("Time Elapsed", True), ("Time Remaining", True), ("Action Required", False)),
+    },
+    "sla": {"title": "🕒 Approval SLA", "color": 0x95a5a6, "fields": (("Remaining", True), ("SLA (hours)", True))},
+}
+
+def _build_embed(kind: str, description: str, *values: str, footer: Optional[str] = None) -> discord.Embed:
+    """Fill an _EMBED_SKELETONS entry with its description and field values in one from_dict call"""
+    skeleton = _EMBED_SKELETONS[kind]
+    data = {
+        "title": skeleton["title"],
+        "color": skeleton["color"],
+        "description": description,
+        "fields": [{"name": name, "value": value, "inline": inline} for (name, inline), value in zip(skeleton["fields"], values)],
+    }
+    if footer:
+        data["footer"] = {"text": footer}
+    return discord.Embed.from_dict(data)
+
+# System prompt for parsing approver messages in invoice threads (invariant across calls)
+MESSAGE_PARSE_SYSTEM_PROMPT = (
+    "You are an assistant that extracts structured actions from approver messages in a Discord thread about an invoice.\n"
+    "Decide the user's intent among: approve, reject, status, payment, none.\n"
+    "- approve: The message approves the invoice, optionally specifying a cost center (examples: CC-123, 1001, COSTCENTER: 789).\n"
+    "- reject: The message rejects and may include a reason.\n"
+    "- status: The user asks for current status.\n"
+    "- payment: The user provides a transaction/reference/payment ID. If an Ethereum transaction hash is present (format: 0x followed by 64 hex characters), set intent=payment and extract ONLY that hash as transaction_id.\n"
+    "Rules:\n"
+    "1) When an Ethereum tx hash appears anywhere in the message, transaction_id MUST be that 0x... string (lowercased).\n"
+    "2) Ignore other text, numbers, or references when an Ethereum tx hash is present.\n"
+    "3) If multiple hashes appear, choose the first.\n"
+    "Output strict JSON with keys: intent, cost_center, reason, transaction_id. Use null when not present."
+)
+
+def _fmt_now() -> str:
+    """Local wall-clock time for embed footers"""
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+# Invoice fields that must be present before an invoice enters the workflow
+_REQUIRED = frozenset({
+    "Timestamp", "Vendor Name", "Invoice Number", "Invoice Date",
+    "Total Amount", "Currency", "Line Items Count", "Account Holder",
+    "Bank Address", "Account Number/IBAN"
+})
+
+# Scalar InvoiceState fields stored as invoice_states columns (invoice_data stays an opaque JSON blob)
+STATE_COLUMNS = (
+    "discord_thread_id", "discord_message_id", "approval_status", "cost_center", "approver",
+    "rejection_reason", "payment_status", "transaction_id", "paid_amount_eth", "reminder_count",
+    "last_reminder", "spreadsheet_row", "sla_message_id", "approval_sla_hours"
+)
+
+# Expected header row (columns A..T) of the invoice worksheet
+SHEET_HEADERS = [
+    "Timestamp", "Vendor Name", "Invoice Number", "Invoice Date",
+    "Total Amount", "Currency", "Line Items Count", "Account Holder",
+    "Bank Address", "Account Number/IBAN", "Discord Thread URL",
+    "Status", "Approver", "Cost Center", "Rejection Reason",
+    "Payment Status", "Transaction ID", "Paid Amount (ETH)", "Created At", "Updated At"
+]
+
 class InvoiceApprovalAgent:
+    # Fast-path intent patterns checked before falling back to the LLM parser
+    _INTENT_RE = {
+        'approve': re.compile(r'^\s*APPROVE\b[\s,.:;-]*(?P<cc>.+?)?\s*$', re.I | re.S),
+        'reject': re.compile(r'^\s*REJECT\b\s*(?P<reason>.*)', re.I | re.S),
+        'status': re.compile(r'^\s*STATUS\b', re.I),
+        'txhash': re.compile(r'\b0x[a-fA-F0-9]{64}\b'),
+    }
+    # LLM response JSON extraction and heuristic fallback patterns
+    _JSON_RE = re.compile(r"\{[\s\S]*\}")
+    _CC_RE = re.compile(r"(cc[-\s:]?\s*\w+|cost\s*center[:\s]*\w+|\b\d{3,6}\b)", re.IGNORECASE)
+    _REASON_RE = re.compile(r"(?:because|due to|reason[:\s])\s+(.+)$", re.IGNORECASE)
+    # Cadence of the SLA countdown refresh for pending invoices
+    _SLA_REFRESH_SECONDS = 120
+    # Upper bound on one reminder tick so a stuck Discord call cannot stall the scheduler
+    _REMINDER_TICK_TIMEOUT = 90
+    
     def __init__(self, config: Config):
         self.config = config
         self.llm = ChatOpenAI(
@@ -76,6 +253,19 @@ class InvoiceApprovalAgent:
             api_key=config.openai_api_key,
             temperature=0.1
         )
+        # Message-parse chain: the prompt template is built once and reused for every message
+        self._parse_chain = ChatPromptTemplate.from_messages(
+            [
+                ("system", MESSAGE_PARSE_SYSTEM_PROMPT),
+                ("user", "Invoice number: {invoice_number}\nMessage: {content}"),
+            ]
+        ) | self.llm
+        # Memoized LLM parse results keyed on the raw message text
+        self._llm_parse_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._llm_parse_cache_max = 1024
+        # Confirmed Etherscan lookups keyed on normalized tx hash -> (success, amount_eth)
+        self._tx_info_cache: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._tx_info_cache_max = 4096
         
         # Initialize Discord client
         intents = discord.Intents.default()
@@ -83,8 +273,43 @@ class InvoiceApprovalAgent:
         intents.members = True
         self.discord_client = discord.Client(intents=intents)
         self.fallback_channel_name = getattr(config, "fallback_channel_name", None)
+        self._role_mention = f"<@&{config.approving_team_role_id}>"
         self.shutting_down = False
         
+        # Bounded pool for blocking gspread/sqlite calls so they never stall the event loop
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="io")
+        
+        # Write-through LRU cache of invoice states; dirty entries are pending a coalesced write
+        # invoice number -> (state, pre-rendered status embed dict)
+        self._state_cache: "OrderedDict[str, Tuple[InvoiceState, Dict[str, Any]]]" = OrderedDict()
+        self._state_cache_max = 512
+        self._state_cache_lock = threading.Lock()
+        self._dirty_states: Dict[str, InvoiceState] = {}
+        
+        # Min-heap of (next_due_ts, invoice_number) driving SLA refreshes and reminders;
+        # _reminder_due holds the live due time per invoice so superseded heap entries are skipped
+        self._reminder_heap: List[Tuple[float, str]] = []
+        self._reminder_due: Dict[str, float] = {}
+        self._reminder_wakeup = asyncio.Event()
+        self._reminder_runner: Optional[asyncio.Task] = None
+        
+        # Spreadsheet row updates run behind a queue of invoice numbers; _sheet_pending holds the
+        # latest state per invoice so bursts of updates collapse into one Sheets write
+        self._sheet_queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._sheet_pending: Dict[str, InvoiceState] = {}
+        self._sheet_worker: Optional[asyncio.Task] = None
+        
+        # Global cap on in-flight Discord API calls to stay inside per-route rate-limit buckets
+        self._discord_sem = asyncio.Semaphore(8)
+        # SLA countdown (message, last posted text) by id: skips fetch_message on every refresh and
+        # no-op edits
+        self._sla_msg_cache: "OrderedDict[str, Tuple[discord.Message, str]]" = OrderedDict()
+        self._sla_msg_cache_max = 512
+        # Global cap on concurrent SLA edits (not a rate limit; discord.py waits out per-route 429s itself)
+        self._edit_sem = asyncio.Semaphore(5)
+        # Resolved approval channel (skips repeated fetch_channel/guild scans)
+        self._resolved_channel = None
+        
         # Initialize Google Sheets
         self.init_google_sheets()
         
@@ -109,7 +334,15 @@ class InvoiceApprovalAgent:
                 scopes=scope
             )
             
-            self.gc = gspread.authorize(sheets_creds)
+            # Persistent keep-alive session with a pooled, retrying adapter shared by all Sheets calls
+            session = AuthorizedSession(sheets_creds)
+            adapter = HTTPAdapter(
+                pool_connections=8,
+                pool_maxsize=8,
+                max_retries=Retry(total=5, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+            )
+            session.mount("https://", adapter)
+            self.gc = gspread.Client(auth=sheets_creds, session=session)
             self.sheet = self.gc.open_by_key(self.config.spreadsheet_id)
             
             # Create worksheet if it doesn't exist
@@ -121,47 +354,93 @@ class InvoiceApprovalAgent:
                     rows=1000,
                     cols=20
                 )
-            # Normalize header row to expected schema
-            expected_headers = [
-                "Timestamp", "Vendor Name", "Invoice Number", "Invoice Date",
-                "Total Amount", "Currency", "Line Items Count", "Account Holder",
-                "Bank Address", "Account Number/IBAN", "Discord Thread URL",
-                "Status", "Approver", "Cost Center", "Rejection Reason",
-                "Payment Status", "Transaction ID", "Paid Amount (ETH)", "Created At", "Updated At"
-            ]
-            try:
-                current_headers = self.worksheet.row_values(1)
-                if current_headers != expected_headers:
-                    self.worksheet.update("A1:T1", [expected_headers])
-                    logger.info("Initialized/normalized header row in worksheet")
-            except Exception as e:
-                logger.warning(f"Failed to normalize header row: {e}")
+            # Cache the worksheet id and A1 range prefix so later updates need no metadata lookups
+            self._ws_gid = self.worksheet.id
+            self._ws_range_prefix = "'{}'!".format(self.worksheet.title.replace("'", "''"))
+            # Normalize header row to expected schema (one-shot at startup)
+            self._expected_header_hash = hash(tuple(SHEET_HEADERS))
+            self._header_ok = False
+            self.ensure_sheet_headers()
                 
         except Exception as e:
             logger.error(f"Failed to initialize Google Sheets: {e}")
             raise
     
+    def ensure_sheet_headers(self, force: bool = False):
+        """Verify the A1:T1 header row once; pass force=True to re-check after a schema change"""
+        if self._header_ok and not force:
+            return
+        try:
+            current = self.worksheet.get("A1:T1")
+            current_headers = tuple(current[0]) if current else ()
+            if hash(current_headers) != self._expected_header_hash:
+                self.worksheet.update("A1:T1", [SHEET_HEADERS])
+                logger.info("Initialized/normalized header row in worksheet")
+            self._header_ok = True
+        except Exception as e:
+            logger.warning(f"Failed to normalize header row: {e}")
+    
     def init_database(self):
         """Initialize SQLite database for state persistence"""
-        self.conn = sqlite3.connect('invoice_states.db', check_same_thread=False, timeout=30)
+        # Autocommit mode (isolation_level=None): transactions are explicit via BEGIN/COMMIT
+        self._db_path = 'invoice_states.db'
+        self.conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30, isolation_level=None)
         cursor = self.conn.cursor()
-        try:
-            cursor.execute('PRAGMA journal_mode=WAL;')
-        except Exception:
-            pass
-        try:
-            cursor.execute('PRAGMA busy_timeout=5000;')
-        except Exception:
-            pass
-        
+        # WAL lets readers proceed alongside the single writer; NORMAL sync is safe under WAL
+        cursor.execute('PRAGMA journal_mode=WAL;')
+        cursor.execute('PRAGMA synchronous=NORMAL;')
+        cursor.execute('PRAGMA busy_timeout=30000;')
+        cursor.execute('PRAGMA temp_store=MEMORY;')
+        cursor.execute('PRAGMA cache_size=-20000;')
+        cursor.execute('PRAGMA wal_autocheckpoint=1000;')
+        cursor.execute('PRAGMA mmap_size=134217728;')
+        journal_mode = cursor.execute('PRAGMA journal_mode;').fetchone()[0]
+        if str(journal_mode).lower() != 'wal':
+            logger.warning(f"SQLite WAL mode not applied (journal_mode={journal_mode})")
+
+        cursor.execute('BEGIN IMMEDIATE')
+        # Migrate the legacy single-blob schema (state_json) to one column per state field
+        legacy_cols = [row[1] for row in cursor.execute('PRAGMA table_info(invoice_states)').fetchall()]
+        if 'state_json' in legacy_cols:
+            cursor.execute('ALTER TABLE invoice_states RENAME TO invoice_states_legacy')
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS invoice_states (
                 invoice_number TEXT PRIMARY KEY,
-                state_json TEXT,
+                discord_thread_id TEXT,
+                discord_message_id TEXT,
+                approval_status TEXT,
+                cost_center TEXT,
+                approver TEXT,
+                rejection_reason TEXT,
+                payment_status TEXT,
+                transaction_id TEXT,
+                paid_amount_eth REAL,
+                reminder_count INTEGER,
+                last_reminder TEXT,
+                spreadsheet_row INTEGER,
+                sla_message_id TEXT,
+                approval_sla_hours INTEGER,
+                invoice_data_json TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_thread ON invoice_states(discord_thread_id)')
+        # Partial index: the reminder rebuild only ever touches pending rows
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_pending ON invoice_states(approval_status, last_reminder)
+            WHERE approval_status = 'pending'
+        ''')
+        if 'state_json' in legacy_cols:
+            extracted = ", ".join(f"json_extract(state_json, '$.{col}')" for col in STATE_COLUMNS)
+            cursor.execute(f'''
+                INSERT INTO invoice_states
+                    (invoice_number, {", ".join(STATE_COLUMNS)}, invoice_data_json, created_at, updated_at)
+                SELECT invoice_number, {extracted}, json_extract(state_json, '$.invoice_data'), created_at, updated_at
+                FROM invoice_states_legacy
+            ''')
+            cursor.execute('DROP TABLE invoice_states_legacy')
+            logger.info("Migrated invoice_states from state_json blobs to columns")
         # Deterministic mapping: Discord thread -> invoice number
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS thread_map (
@@ -170,35 +449,211 @@ class InvoiceApprovalAgent:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        self.conn.commit()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_thread_map_invoice ON thread_map(invoice_number)')
+        # Backfill thread_map from legacy rows so thread lookups never need a JSON LIKE scan
+        cursor.execute('''
+            INSERT OR IGNORE INTO thread_map (thread_id, invoice_number)
+            SELECT discord_thread_id, invoice_number
+            FROM invoice_states
+            WHERE discord_thread_id IS NOT NULL
+        ''')
+        cursor.execute('COMMIT')
+        
+        # Single long-lived cursor for all writes, serialized across I/O threads
+        self._write_cursor = self.conn.cursor()
+        self._write_lock = threading.RLock()
+        # Reads use one connection per I/O thread so they run alongside the writer under WAL
+        self._read_local = threading.local()
+        self._read_conns: List[sqlite3.Connection] = []
+        self._read_conns_lock = threading.Lock()
+        # Callbacks fired with an invoice number after its state row is committed, so in-process
+        # readers (DiscordNodes) wait on a notification instead of polling invoice_states
+        self._state_listeners: List[Callable[[str], None]] = []
+    
+    def add_state_listener(self, callback: Callable[[str], None]):
+        """Register a callback run (on the writing I/O thread) after each committed state write"""
+        self._state_listeners.append(callback)
+    
+    def _notify_state_written(self, invoice_numbers: List[str]):
+        """Tell listeners these invoices' rows were just committed"""
+        for callback in self._state_listeners:
+            for invoice_number in invoice_numbers:
+                try:
+                    callback(invoice_number)
+                except Exception as e:
+                    logger.warning(f"State listener failed for {invoice_number}: {e}")
     
-    def save_state(self, invoice_number: str, state: InvoiceState):
-        """Save invoice state to database"""
+    def _read_conn(self) -> sqlite3.Connection:
+        """Return this thread's read-only connection, opening it on first use"""
+        conn = getattr(self._read_local, 'conn', None)
+        if conn is None:
+            # check_same_thread=False only so stop() can close it from the loop thread
+            conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA query_only=ON;')
+            conn.execute('PRAGMA temp_store=MEMORY;')
+            conn.execute('PRAGMA mmap_size=134217728;')
+            self._read_local.conn = conn
+            with self._read_conns_lock:
+                self._read_conns.append(conn)
+        return conn
+    
+    def _execute_write_sync(self, sql: str, params: tuple, commit: bool = True):
+        """Execute a write on the shared cursor, retrying while the database is locked.
+        
+        With commit=False the caller owns an open BEGIN IMMEDIATE transaction and commits it.
+        Executor-only: the busy backoff uses time.sleep, so this must never run on the event loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("Blocking sqlite write called on the event loop; use save_state()/_run_io()")
         retries = 5
         delay = 0.1
-        for attempt in range(retries):
+        with self._write_lock:
+            for attempt in range(retries):
+                try:
+                    self._write_cursor.execute(sql, params)
+                    if commit and self.conn.in_transaction:
+                        self._write_cursor.execute('COMMIT')
+                    break
+                except sqlite3.OperationalError as e:
+                    if "locked" in str(e).lower() or "busy" in str(e).lower():
+                        time.sleep(delay)
+                        delay *= 2
+                        continue
+                    raise
+    
+    async def _run_io(self, func, *args):
+        """Run a blocking gspread/sqlite call on the I/O thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, func, *args)
+    
+    def _cache_get_state(self, invoice_number: str) -> Optional[InvoiceState]:
+        """Return a copy of the cached state, if present"""
+        with self._state_cache_lock:
+            cached = self._state_cache.get(invoice_number)
+            if cached is None:
+                return None
+            self._state_cache.move_to_end(invoice_number)
+            return dict(cached[0])
+    
+    def _cache_get_status_embed(self, invoice_number: str, state: InvoiceState) -> Optional[Dict[str, Any]]:
+        """Return the pre-rendered status embed dict if it was rendered from this exact state"""
+        with self._state_cache_lock:
+            cached = self._state_cache.get(invoice_number)
+        if cached is None or cached[0] != state:
+            return None
+        return cached[1]
+    
+    def _cache_put_state(self, invoice_number: str, state: InvoiceState):
+        """Insert/refresh a state in the LRU cache, evicting the oldest entry on overflow"""
+        # Pre-render the status embed so status/duplicate-decision replies skip rebuilding it
+        cached = (dict(state), self._render_status_embed_dict(state))
+        with self._state_cache_lock:
+            self._state_cache[invoice_number] = cached
+            self._state_cache.move_to_end(invoice_number)
+            while len(self._state_cache) > self._state_cache_max:
+                self._state_cache.popitem(last=False)
+    
+    async def save_state(self, invoice_number: str, state: InvoiceState, defer: bool = False):
+        """Save invoice state to database (defer=True only holds it in memory until flush_states)"""
+        self._schedule_reminder(invoice_number, state)
+        if defer:
+            self._dirty_states[invoice_number] = dict(state)
+            return
+        self._dirty_states.pop(invoice_number, None)
+        await self._run_io(self._save_state_sync, invoice_number, state)
+    
+    async def flush_states(self, invoice_numbers: List[str]):
+        """Write all pending deferred states for these invoices under a single commit"""
+        items = [(inv, self._dirty_states.pop(inv)) for inv in invoice_numbers if inv in self._dirty_states]
+        if items:
+            await self._run_io(self._save_states_sync, items)
+    
+    def _save_states_sync(self, items: List[Tuple[str, InvoiceState]]):
+        """Save several states in one BEGIN IMMEDIATE ... COMMIT (blocking)"""
+        with self._write_lock:
+            self._write_cursor.execute('BEGIN IMMEDIATE')
             try:
-                cursor = self.conn.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO invoice_states (invoice_number, state_json, updated_at)
-                    VALUES (?, ?, CURRENT_TIMESTAMP)
-                ''', (invoice_number, json.dumps(state, default=str)))
-                self.conn.commit()
-                break
-            except sqlite3.OperationalError as e:
-                if "locked" in str(e).lower() or "busy" in str(e).lower():
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
+                for invoice_number, state in items:
+                    self._save_state_sync(invoice_number, state, commit=False)
+                self._write_cursor.execute('COMMIT')
+                self._notify_state_written([inv for inv, _ in items])
+            except Exception:
+                self._write_cursor.execute('ROLLBACK')
+                # The cache was refreshed inside the rolled-back transaction; drop those entries
+                with self._state_cache_lock:
+                    for invoice_number, _ in items:
+                        self._state_cache.pop(invoice_number, None)
                 raise
     
-    def load_state(self, invoice_number: str) -> Optional[InvoiceState]:
+    async def load_state(self, invoice_number: str) -> Optional[InvoiceState]:
         """Load invoice state from database"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT state_json FROM invoice_states WHERE invoice_number = ?', (invoice_number,))
+        pending = self._dirty_states.get(invoice_number)
+        if pending is not None:
+            return dict(pending)
+        cached = self._cache_get_state(invoice_number)
+        if cached is not None:
+            return cached
+        return await self._run_io(self._load_state_sync, invoice_number)
+    
+    @staticmethod
+    def _state_from_row(row: sqlite3.Row) -> InvoiceState:
+        """Build an InvoiceState from an invoice_states row"""
+        state = {col: row[col] for col in STATE_COLUMNS}
+        raw = row['invoice_data_json']
+        state['invoice_data'] = (orjson.loads(raw) if orjson is not None else json.loads(raw)) if raw else {}
+        return state
+    
+    @staticmethod
+    def _dump_invoice_data(invoice_data: Optional[Dict[str, Any]]) -> str:
+        """Serialize invoice_data compactly for the invoice_data_json column"""
+        if orjson is not None:
+            return orjson.dumps(invoice_data, default=str).decode()
+        return json.dumps(invoice_data, default=str, separators=(',', ':'))
+    
+    def _save_state_sync(self, invoice_number: str, state: InvoiceState, commit: bool = True):
+        """Save invoice state to database, writing only columns changed since the cached copy (blocking)"""
+        with self._write_lock:
+            previous = self._cache_get_state(invoice_number)
+            if previous is None:
+                # Unknown row: full upsert
+                values = [state.get(col) for col in STATE_COLUMNS]
+                self._execute_write_sync(f'''
+                    INSERT INTO invoice_states (invoice_number, {", ".join(STATE_COLUMNS)}, invoice_data_json, updated_at)
+                    VALUES (?, {", ".join("?" for _ in STATE_COLUMNS)}, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(invoice_number) DO UPDATE SET
+                        {", ".join(f"{col} = excluded.{col}" for col in STATE_COLUMNS)},
+                        invoice_data_json = excluded.invoice_data_json,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (invoice_number, *values, self._dump_invoice_data(state.get('invoice_data'))), commit)
+            else:
+                changed = [col for col in STATE_COLUMNS if state.get(col) != previous.get(col)]
+                values = [state.get(col) for col in changed]
+                if state.get('invoice_data') != previous.get('invoice_data'):
+                    changed.append('invoice_data_json')
+                    values.append(self._dump_invoice_data(state.get('invoice_data')))
+                if changed:
+                    self._execute_write_sync(f'''
+                        UPDATE invoice_states
+                        SET {", ".join(f"{col} = ?" for col in changed)}, updated_at = CURRENT_TIMESTAMP
+                        WHERE invoice_number = ?
+                    ''', (*values, invoice_number), commit)
+            self._cache_put_state(invoice_number, state)
+            if commit:
+                self._notify_state_written([invoice_number])
+    
+    def _load_state_sync(self, invoice_number: str) -> Optional[InvoiceState]:
+        """Load invoice state from database (blocking)"""
+        cursor = self._read_conn().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute('SELECT * FROM invoice_states WHERE invoice_number = ?', (invoice_number,))
         result = cursor.fetchone()
         if result:
-            return json.loads(result[0])
+            self._cache_put_state(invoice_number, self._state_from_row(result))
+            return self._cache_get_state(invoice_number)
         return None
     
     def create_workflow(self) -> StateGraph:
@@ -225,108 +680,72 @@ class InvoiceApprovalAgent:
         logger.info(f"Processing invoice: {state['invoice_data'].get('Invoice Number')}")
         
         # Validate invoice data
-        required_fields = [
-            "Timestamp", "Vendor Name", "Invoice Number", "Invoice Date",
-            "Total Amount", "Currency", "Line Items Count", "Account Holder",
-            "Bank Address", "Account Number/IBAN"
-        ]
-        
-        missing_fields = [field for field in required_fields if field not in state['invoice_data']]
+        missing_fields = _REQUIRED - state['invoice_data'].keys()
         if missing_fields:
-            raise ValueError(f"Missing required fields: {missing_fields}")
+            raise ValueError(f"Missing required fields: {sorted(missing_fields)}")
         
         # Initialize state
-        new_state = state.copy()
-        new_state.update({
+        return {
+            **state,
             'approval_status': 'pending',
             'payment_status': 'pending',
             'reminder_count': 0,
             'last_reminder': None
-        })
-        
-        return new_state
+        }
     
-    async def post_to_discord_node(self, state: InvoiceState) -> InvoiceState:
-        """Post invoice details to Discord for approval"""
-        invoice_data = state['invoice_data']
-        
-        # Ensure Discord client is ready before accessing channels
-        await self.discord_client.wait_until_ready()
-        
-        # Create embed with invoice details
-        embed = discord.Embed(
-            title="🧾 Invoice Approval Request",
-            description=f"**Vendor:** {invoice_data['Vendor Name']}",
-            color=0x3498db
-        )
-        
-        embed.add_field(
-            name="📋 Invoice Details",
-            value=f"**Number:** {invoice_data['Invoice Number']}\n"
-                  f"**Date:** {invoice_data['Invoice Date']}\n"
-                  f"**Amount:** {invoice_data['Total Amount']} {invoice_data['Currency']}",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="🏦 Payment Details",
-            value=f"**Account Holder:** {invoice_data['Account Holder']}\n"
-                  f"**Bank:** {invoice_data['Bank Address']}\n"
-                  f"**Account:** {invoice_data['Account Number/IBAN']}",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="📊 Additional Info",
-            value=f"**Line Items:** {invoice_data['Line Items Count']}\n"
-                  f"**Submitted:** {invoice_data['Timestamp']}",
-            inline=False
-        )
-        
-        embed.add_field(
-            name="⚡ Action Required",
-            value="Please respond with:\n"
-                  "• `APPROVE <cost_center>` to approve\n"
-                  "• `REJECT <reason>` to reject\n\n"
-                  f"<@&{self.config.approving_team_role_id}>",
-            inline=False
-        )
-        
-        # Post to Discord (robust resolution with fetch_channel and type handling)
+    def _resolve_by_name(self):
+        """Find the fallback channel by name in one pass over all guild channels (text preferred over forum)"""
+        name = (self.fallback_channel_name or "").lower()
+        if not name:
+            return None
+        forum = None
+        for guild in self.discord_client.guilds:
+            for ch in getattr(guild, "channels", []):
+                if getattr(ch, "name", "").lower() != name:
+                    continue
+                if isinstance(ch, discord.TextChannel):
+                    return ch
+                if forum is None and ForumChannel is not None and isinstance(ch, ForumChannel):
+                    forum = ch
+        return forum
+
+    async def _resolve_post_channel(self):
+        """Resolve (and cache) the approval channel: cache, then fetch_channel, then fallback by name"""
+        if self._resolved_channel is not None:
+            return self._resolved_channel
         channel = self.discord_client.get_channel(self.config.discord_channel_id)
         if channel is None:
             try:
                 channel = await self.discord_client.fetch_channel(self.config.discord_channel_id)
             except Exception:
                 channel = None
-
         if channel is None:
-            # Fallback by name if configured
-            if self.fallback_channel_name:
-                # Try text channels across all guilds
-                for guild in self.discord_client.guilds:
-                    for ch in getattr(guild, "text_channels", []):
-                        if ch.name.lower() == self.fallback_channel_name.lower():
-                            channel = ch
-                            break
-                    if channel:
-                        break
-                # Try forum channels if still not found
-                if channel is None:
-                    for guild in self.discord_client.guilds:
-                        for ch in getattr(guild, "channels", []):
-                            try:
-                                from discord import ForumChannel
-                                if isinstance(ch, ForumChannel) and ch.name.lower() == self.fallback_channel_name.lower():
-                                    channel = ch
-                                    break
-                            except Exception:
-                                continue
-                        if channel:
-                            break
+            channel = self._resolve_by_name()
             if channel is None:
                 raise ValueError(f"Cannot access Discord channel {self.config.discord_channel_id} and no fallback channel named '{self.fallback_channel_name}' was found")
 
+        self._resolved_channel = channel
+        return channel
+
+    async def post_to_discord_node(self, state: InvoiceState) -> InvoiceState:
+        """Post invoice details to Discord for approval"""
+        invoice_data = state['invoice_data']
+        
+        # Ensure Discord client is ready before accessing channels
+        await self.discord_client.wait_until_ready()
+        
+        # Create embed with invoice details from the precomputed template
+        embed = discord.Embed.from_dict({
+            **_EMBED_TEMPLATE,
+            "description": f"**Vendor:** {invoice_data['Vendor Name']}",
+            "fields": [
+                {**field, "value": field["value"].format(**invoice_data, role=self._role_mention)}
+                for field in _EMBED_TEMPLATE["fields"]
+            ]
+        })
+        
+        channel = await self._resolve_post_channel()
+
         logger.info(f"Posting to Discord channel: id={getattr(channel, 'id', None)} type={type(channel)} name={getattr(channel, 'name', None)}")
         thread = None
         message = None
@@ -334,21 +753,25 @@ class InvoiceApprovalAgent:
         try:
             # Text channel: send embed and create a thread off the message
             if isinstance(channel, discord.TextChannel):
-                message = await channel.send(embed=embed)
-                thread = await message.create_thread(
-                    name=f"Invoice {invoice_data['Invoice Number']} - {invoice_data['Vendor Name']}"
-                )
+                async with self._discord_sem:
+                    message = await channel.send(embed=embed)
+                async with self._discord_sem:
+                    thread = await message.create_thread(
+                        name=f"Invoice {invoice_data['Invoice Number']} - {invoice_data['Vendor Name']}"
+                    )
             # Existing thread: just post into it and reuse
             elif isinstance(channel, discord.Thread):
-                message = await channel.send(embed=embed)
+                async with self._discord_sem:
+                    message = await channel.send(embed=embed)
                 thread = channel
             # Forum channel: create a forum thread with the embed as the first message
-            elif hasattr(discord, "ForumChannel") and isinstance(channel, discord.ForumChannel):
-                created = await channel.create_thread(
-                    name=f"Invoice {invoice_data['Invoice Number']} - {invoice_data['Vendor Name']}",
-                    content=None,
-                    embed=embed
-                )
+            elif ForumChannel is not None and isinstance(channel, ForumChannel):
+                async with self._discord_sem:
+                    created = await channel.create_thread(
+                        name=f"Invoice {invoice_data['Invoice Number']} - {invoice_data['Vendor Name']}",
+                        content=None,
+                        embed=embed
+                    )
                 # Some versions return (thread, message)
                 if isinstance(created, tuple) and len(created) >= 1:
                     thread = created[0]
@@ -356,9 +779,12 @@ class InvoiceApprovalAgent:
                     thread = created
             else:
                 # Fallback: send in the channel and treat the channel as the discussion context
-                message = await channel.send(embed=embed)
+                async with self._discord_sem:
+                    message = await channel.send(embed=embed)
                 thread = message.channel
         except Exception as e:
+            # Drop the cached channel so the next post re-resolves it
+            self._resolved_channel = None
             raise ValueError(f"Cannot access Discord channel {self.config.discord_channel_id} ({type(channel)}): {e}")
         
         new_state = state.copy()
@@ -371,55 +797,53 @@ class InvoiceApprovalAgent:
         if updated_state is not None:
             new_state = updated_state
         
-        # Save state
-        self.save_state(invoice_data['Invoice Number'], new_state)
-        # Persist thread -> invoice mapping for reliable event handling
-        try:
-            retries = 5
-            delay = 0.1
-            for attempt in range(retries):
-                try:
-                    c = self.conn.cursor()
-                    c.execute(
-                        'INSERT OR REPLACE INTO thread_map (thread_id, invoice_number, created_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
-                        (new_state['discord_thread_id'], invoice_data['Invoice Number'])
-                    )
-                    self.conn.commit()
-                    break
-                except sqlite3.OperationalError as e:
-                    if "locked" in str(e).lower() or "busy" in str(e).lower():
-                        time.sleep(delay)
-                        delay *= 2
-                        continue
-                    raise
-        except Exception as e:
-            logger.warning(f"Failed to write thread_map: {e}")
+        # Save state and persist thread -> invoice mapping in one transaction
+        self._dirty_states.pop(invoice_data['Invoice Number'], None)
+        await self._run_io(self._save_posted_state_sync, invoice_data['Invoice Number'], new_state)
+        self._schedule_reminder(invoice_data['Invoice Number'], new_state)
         
         return new_state
     
-    def update_spreadsheet_node(self, state: InvoiceState) -> InvoiceState:
+    def _save_posted_state_sync(self, invoice_number: str, state: InvoiceState):
+        """Write the posted state and its thread_map row under a single commit (blocking)"""
+        with self._write_lock:
+            self._write_cursor.execute('BEGIN IMMEDIATE')
+            try:
+                self._save_state_sync(invoice_number, state, commit=False)
+                try:
+                    self._save_thread_map_sync(state['discord_thread_id'], invoice_number, commit=False)
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to write thread_map: {e}")
+                self._write_cursor.execute('COMMIT')
+                self._notify_state_written([invoice_number])
+            except Exception:
+                self._write_cursor.execute('ROLLBACK')
+                # The cache was refreshed inside the rolled-back transaction; drop it
+                with self._state_cache_lock:
+                    self._state_cache.pop(invoice_number, None)
+                raise
+    
+    def _save_thread_map_sync(self, thread_id: str, invoice_number: str, commit: bool = True):
+        """Persist a Discord thread -> invoice number mapping (blocking)"""
+        self._execute_write_sync(
+            'INSERT OR REPLACE INTO thread_map (thread_id, invoice_number, created_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
+            (thread_id, invoice_number),
+            commit
+        )
+    
+    async def update_spreadsheet_node(self, state: InvoiceState) -> InvoiceState:
         """Update Google Spreadsheet with invoice details"""
+        return await self._run_io(self._update_spreadsheet_node_sync, state)
+    
+    def _update_spreadsheet_node_sync(self, state: InvoiceState) -> InvoiceState:
+        """Append the invoice row to the spreadsheet (blocking)"""
         invoice_data = state['invoice_data']
+        now_iso = datetime.now().isoformat()
         
         # Create Discord thread URL (approximate - you'll need actual guild ID)
         thread_url = f"https://discord.com/channels/@me/{state['discord_thread_id']}"
         
-        # Ensure header row is normalized to expected schema to prevent column drift
-        expected_headers = [
-            "Timestamp", "Vendor Name", "Invoice Number", "Invoice Date",
-            "Total Amount", "Currency", "Line Items Count", "Account Holder",
-            "Bank Address", "Account Number/IBAN", "Discord Thread URL",
-            "Status", "Approver", "Cost Center", "Rejection Reason",
-            "Payment Status", "Transaction ID", "Paid Amount (ETH)", "Created At", "Updated At"
-        ]
-        try:
-            current_headers = self.worksheet.row_values(1)
-            if current_headers != expected_headers:
-                self.worksheet.update("A1:T1", [expected_headers])
-                logger.info("Normalized header row in existing worksheet")
-        except Exception as e:
-            logger.warning(f"Header normalization failed: {e}")
-        
+        # Header row is normalized once in init_google_sheets
         row_data = [
             invoice_data['Timestamp'],
             invoice_data['Vendor Name'],
@@ -439,16 +863,22 @@ class InvoiceApprovalAgent:
             state['payment_status'],
             state.get('transaction_id', ''),
             state.get('paid_amount_eth', ''),
-            datetime.now().isoformat(),
-            datetime.now().isoformat()
+            now_iso,  # Created At
+            now_iso  # Updated At
         ]
         
         # Append with retries for robustness
         append_ok = False
+        append_resp = None
         for attempt in range(1, 4):
             try:
                 logger.info(f"Appending spreadsheet row (attempt {attempt})")
-                self.worksheet.append_row(row_data, value_input_option="RAW")
+                append_resp = self.worksheet.append_row(
+                    row_data,
+                    value_input_option="RAW",
+                    insert_data_option="INSERT_ROWS",
+                    include_values_in_response=False
+                )
                 append_ok = True
                 break
             except Exception as e:
@@ -458,13 +888,18 @@ class InvoiceApprovalAgent:
             logger.error("append_row failed after retries in update_spreadsheet_node")
             raise
         
-        # Get the row number for future updates
-        all_values = self.worksheet.get_all_values()
+        # Get the row number for future updates from the append response (e.g. "Invoice!A5:T5")
+        updated_range = ((append_resp or {}).get('updates') or {}).get('updatedRange', '')
+        row_match = re.search(r'[A-Z]+(\d+)(?::[A-Z]+\d+)?$', updated_range)
         new_state = state.copy()
-        new_state['spreadsheet_row'] = len(all_values)
+        if row_match:
+            new_state['spreadsheet_row'] = int(row_match.group(1))
+        else:
+            # Fallback when the API response does not carry the range
+            new_state['spreadsheet_row'] = len(self.worksheet.col_values(1))
         logger.info(f"Spreadsheet row appended at index {new_state['spreadsheet_row']}")
         
-        self.save_state(invoice_data['Invoice Number'], new_state)
+        self._save_state_sync(invoice_data['Invoice Number'], new_state)
         return new_state
     
     def finalize_invoice_node(self, state: InvoiceState) -> InvoiceState:
@@ -472,10 +907,33 @@ class InvoiceApprovalAgent:
         logger.info(f"Invoice {state['invoice_data']['Invoice Number']} process completed")
         return state
     
-    def update_spreadsheet_row(self, state: InvoiceState):
-        """Update specific row in spreadsheet"""
+    async def update_spreadsheet_row(self, state: InvoiceState):
+        """Queue a spreadsheet row update; returns without waiting for Google Sheets"""
+        invoice_number = state['invoice_data']['Invoice Number']
+        if invoice_number not in self._sheet_pending:
+            self._sheet_queue.put_nowait(invoice_number)
+        self._sheet_pending[invoice_number] = dict(state)
+        if self._sheet_worker is None or self._sheet_worker.done():
+            self._sheet_worker = asyncio.create_task(self._sheet_consumer())
+    
+    async def _sheet_consumer(self):
+        """Background task writing queued row updates one at a time on the I/O pool"""
+        while True:
+            invoice_number = await self._sheet_queue.get()
+            try:
+                state = self._sheet_pending.pop(invoice_number, None)
+                if state is not None:
+                    await self._run_io(self._update_spreadsheet_row_sync, state)
+            except Exception as e:
+                logger.error(f"Failed to update spreadsheet row for {invoice_number}: {e}")
+            finally:
+                self._sheet_queue.task_done()
+    
+    def _update_spreadsheet_row_sync(self, state: InvoiceState):
+        """Update specific row in spreadsheet (blocking)"""
         if state.get('spreadsheet_row'):
             row = state['spreadsheet_row']
+            now_iso = datetime.now().isoformat()
             
             # Determine the overall status
             if state['payment_status'] == 'completed' and state.get('transaction_id'):
@@ -489,20 +947,29 @@ class InvoiceApprovalAgent:
             else:
                 overall_status = state['approval_status']
             
-            # Update specific columns
-            updates = [
-                (row, 12, overall_status),  # Status - now shows 'completed' when payment is done
-                (row, 13, state.get('approver', '')),  # Approver
-                (row, 14, state.get('cost_center', '')),  # Cost Center
-                (row, 15, state.get('rejection_reason', '')),  # Rejection Reason
-                (row, 16, state['payment_status']),  # Payment Status
-                (row, 17, state.get('transaction_id', '')),  # Transaction ID
-                (row, 18, state.get('paid_amount_eth', '')),  # Paid Amount (ETH)
-                (row, 20, datetime.now().isoformat())  # Updated At
-            ]
-            
-            for row_num, col_num, value in updates:
-                self.worksheet.update_cell(row_num, col_num, value)
+            # Update columns L..R and T in a single values.batchUpdate round-trip
+            body = {
+                "valueInputOption": "RAW",
+                "data": [
+                    {
+                        "range": f"{self._ws_range_prefix}L{row}:R{row}",
+                        "values": [[
+                            overall_status,  # Status - now shows 'completed' when payment is done
+                            state.get('approver', ''),  # Approver
+                            state.get('cost_center', ''),  # Cost Center
+                            state.get('rejection_reason', ''),  # Rejection Reason
+                            state['payment_status'],  # Payment Status
+                            state.get('transaction_id', ''),  # Transaction ID
+                            state.get('paid_amount_eth', '')  # Paid Amount (ETH)
+                        ]]
+                    },
+                    {
+                        "range": f"{self._ws_range_prefix}T{row}",
+                        "values": [[now_iso]]  # Updated At
+                    }
+                ]
+            }
+            self.sheet.values_batch_update(body)
     
     def setup_discord_handlers(self):
         """Setup Discord event handlers"""
@@ -512,10 +979,15 @@ class InvoiceApprovalAgent:
             logger.info(f'{self.discord_client.user} has connected to Discord!')
             # Start reminder task here to ensure a running event loop exists
             try:
-                if not self.reminder_task.is_running():
-                    self.reminder_task.start()
+                if self._reminder_runner is None or self._reminder_runner.done():
+                    self._reminder_runner = asyncio.create_task(self.reminder_task())
             except Exception as e:
                 logger.warning(f"Failed to start reminder task on_ready: {e}")
+            # Resolve the approval channel once so invoice posts skip the lookup
+            try:
+                await self._resolve_post_channel()
+            except Exception as e:
+                logger.warning(f"Failed to resolve Discord channel on_ready: {e}")
         
         @self.discord_client.event
         async def on_message(message):
@@ -536,7 +1008,8 @@ class InvoiceApprovalAgent:
         try:
             if getattr(self, "shutting_down", False) or self.discord_client.is_closed():
                 return None
-            return await channel.send(content=content, embed=embed)
+            async with self._discord_sem:
+                return await channel.send(content=content, embed=embed)
         except RuntimeError as e:
             # Common during shutdown: "cannot schedule new futures after shutdown"
             if "after shutdown" in str(e).lower():
@@ -551,39 +1024,21 @@ class InvoiceApprovalAgent:
         thread_id = str(message.channel.id)
         logger.debug(f"Handling message in thread {thread_id} by user {getattr(message.author, 'id', 'unknown')}")
         
-        # Find invoice state for this thread using deterministic mapping first
-        cursor = self.conn.cursor()
+        # Find invoice state for this thread via the thread_map (backfilled at startup)
         invoice_number = None
         try:
-            cursor.execute('SELECT invoice_number FROM thread_map WHERE thread_id = ?', (thread_id,))
-            row = cursor.fetchone()
-            if row:
-                invoice_number = row[0]
+            invoice_number = await self._run_io(self._lookup_thread_invoice_sync, thread_id)
         except Exception as e:
             logger.debug(f"thread_map lookup failed: {e}")
+        if not invoice_number:
+            logger.debug(f"No state found for thread {thread_id}")
+            return
         
-        state = None
-        if invoice_number:
-            loaded = self.load_state(invoice_number)
-            if not loaded:
-                return
-            state = loaded
-        else:
-            # Fallback to LIKE scan (legacy)
-            try:
-                cursor.execute('''
-                    SELECT invoice_number, state_json FROM invoice_states 
-                    WHERE state_json LIKE ?
-                ''', (f'%"discord_thread_id": "{thread_id}"%',))
-                result = cursor.fetchone()
-                if not result:
-                    logger.debug(f"No state found for thread {thread_id}")
-                    return
-                invoice_number, state_json = result
-                state = json.loads(state_json)
-            except Exception as e:
-                logger.debug(f"Fallback state lookup failed for thread {thread_id}: {e}")
-                return
+        # Cheap status probe (cache or two columns) so no-op messages never load the full state
+        status = await self._load_status(invoice_number)
+        if status is None:
+            return
+        approval_status, payment_status = status
         
         # Check if user has approving role (robust: fetch member if roles not cached)
         has_role = False
@@ -604,8 +1059,18 @@ class InvoiceApprovalAgent:
             return
         
         raw_content = message.content.strip()
-        parsed = await self.parse_message_with_llm(raw_content, state)
+        parsed = self._fast_parse_intent(raw_content)
+        if parsed is None:
+            parsed = await self.parse_message_with_llm(raw_content, invoice_number)
         intent = (parsed.get('intent') or 'none').lower().strip()
+        
+        # Decided and settled invoices only answer status / duplicate-decision messages
+        if approval_status != 'pending' and payment_status != 'pending' and intent not in ('status', 'approve', 'reject'):
+            return
+        
+        state = await self.load_state(invoice_number)
+        if not state:
+            return
 
         if intent == 'status':
             await self.show_invoice_status(message, state)
@@ -615,7 +1080,8 @@ class InvoiceApprovalAgent:
         if state['approval_status'] != 'pending' and intent in ('approve', 'reject'):
             await self.safe_send(
                 message.channel,
-                content=f"ℹ️ Invoice is already {state['approval_status'].upper()} by {state.get('approver','unknown')}."
+                content=f"ℹ️ Invoice is already {state['approval_status'].upper()} by {state.get('approver','unknown')}.",
+                embed=self._status_embed(state)
             )
             return
 
@@ -635,11 +1101,10 @@ class InvoiceApprovalAgent:
 
         # Handle payment confirmation regardless of approval status
         if state['payment_status'] == 'pending':
-            content_upper = raw_content.upper()
             looks_like_payment = (
                 intent == 'payment'
-                or any(k in content_upper for k in ['TX', 'TRANSACTION', 'REF', 'PAYMENT', 'COMPLETED'])
-                or bool(re.search(r'0x[a-fA-F0-9]{64}', raw_content, re.IGNORECASE))
+                or _has_payment_keyword(raw_content)
+                or bool(_TX_HASH.search(raw_content))
             )
             if looks_like_payment:
                 if state.get('transaction_id') and state['payment_status'] == 'completed':
@@ -651,64 +1116,40 @@ class InvoiceApprovalAgent:
                     return
                 transaction_id = parsed.get('transaction_id')
                 if not transaction_id:
-                    tx_patterns = [
-                        r'(0x[a-fA-F0-9]{64})',
-                        r'TX[ID]?[:\s]+([A-Z0-9]{6,})',
-                        r'TRANSACTION[ID]?[:\s]+([A-Z0-9]{6,})',
-                        r'REF[ERENCE]?:[:\s]+([A-Z0-9]{6,})',
-                        r'PAYMENT[:\s]+([A-Z0-9]{6,})',
-                        r'COMPLETED[:\s]+([A-Z0-9]{6,})',
-                        r'([A-Z0-9]{8,64})'
-                    ]
-                    for pattern in tx_patterns:
-                        match = re.search(pattern, raw_content, re.IGNORECASE)
-                        if match:
-                            transaction_id = match.group(1)
-                            break
+                    transaction_id = _extract_transaction_id(raw_content)
                 if transaction_id:
                     # If transaction_id looks like an Ethereum tx hash, verify on Etherscan (Sepolia)
-                    if re.fullmatch(r"0x[a-fA-F0-9]{64}", transaction_id, re.IGNORECASE):
-                        loop = asyncio.get_running_loop()
+                    if _TX_HASH.fullmatch(transaction_id):
                         tx_norm = transaction_id.lower()
-                        success = await loop.run_in_executor(None, lambda: check_transaction_success(tx_norm))
-                        amount_eth = await loop.run_in_executor(None, lambda: get_transaction_amount_eth(tx_norm))
+                        success, amount_eth = await self._tx_info(tx_norm)
                         state['transaction_id'] = tx_norm
                         state['paid_amount_eth'] = amount_eth
                         state['payment_status'] = 'completed' if success else 'failed'
                         # Persist and update Google Sheets
-                        self.save_state(invoice_number, state)
-                        self.update_spreadsheet_row(state)
+                        await self.save_state(invoice_number, state)
+                        await self.update_spreadsheet_row(state)
                         status_text = "successful" if success else "failed"
-                        color = 0x27ae60 if success else 0xe74c3c
-                        icon = "✅" if success else "❌"
-                        embed = discord.Embed(
-                            title=f"{icon} Payment {status_text.capitalize()}",
-                            description=f"Transaction ID **{transaction_id}** for invoice **{invoice_number}**",
-                            color=color
+                        embed = _build_embed(
+                            f"payment_{status_text}",
+                            f"Transaction ID **{transaction_id}** for invoice **{invoice_number}**",
+                            invoice_number, transaction_id, str(amount_eth), status_text.upper(),
+                            footer=f"Updated at {_fmt_now()}"
                         )
-                        embed.add_field(name="Invoice Number", value=invoice_number, inline=True)
-                        embed.add_field(name="Transaction ID", value=transaction_id, inline=False)
-                        embed.add_field(name="Amount (ETH)", value=str(amount_eth), inline=True)
-                        embed.add_field(name="Status", value=status_text.upper(), inline=True)
-                        embed.set_footer(text=f"Updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                         await self.safe_send(message.channel, embed=embed)
                         return
                     # Fallback: treat as non-Ethereum reference and mark completed
                     state['transaction_id'] = transaction_id
                     state['payment_status'] = 'completed'
                     # Immediately persist and update Google Sheets
-                    self.save_state(invoice_number, state)
-                    self.update_spreadsheet_row(state)
+                    await self.save_state(invoice_number, state)
+                    await self.update_spreadsheet_row(state)
                     logger.info(f"Transaction ID {transaction_id} recorded for invoice {invoice_number}")
-                    embed = discord.Embed(
-                        title="✅ Payment Confirmed",
-                        description=f"Transaction ID **{transaction_id}** recorded for invoice **{invoice_number}**\n\nStatus updated to: **COMPLETED**",
-                        color=0x27ae60
+                    embed = _build_embed(
+                        "payment_confirmed",
+                        f"Transaction ID **{transaction_id}** recorded for invoice **{invoice_number}**\n\nStatus updated to: **COMPLETED**",
+                        invoice_number, transaction_id, "COMPLETED",
+                        footer=f"Updated at {_fmt_now()}"
                     )
-                    embed.add_field(name="Invoice Number", value=invoice_number, inline=True)
-                    embed.add_field(name="Transaction ID", value=transaction_id, inline=True)
-                    embed.add_field(name="Status", value="COMPLETED", inline=True)
-                    embed.set_footer(text=f"Updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
                     await self.safe_send(message.channel, embed=embed)
                     return
                 if intent == 'payment':
@@ -721,8 +1162,46 @@ class InvoiceApprovalAgent:
                                 "• `ABC123456789` (just the ID)"
                     )
     
-    async def show_invoice_status(self, message: discord.Message, state: InvoiceState):
-        """Show current status of the invoice"""
+    async def _load_status(self, invoice_number: str) -> Optional[Tuple[str, str]]:
+        """Return (approval_status, payment_status) from memory, else from their columns"""
+        state = self._dirty_states.get(invoice_number) or self._cache_get_state(invoice_number)
+        if state is not None:
+            return state.get('approval_status'), state.get('payment_status')
+        return await self._run_io(self._load_status_sync, invoice_number)
+    
+    def _load_status_sync(self, invoice_number: str) -> Optional[Tuple[str, str]]:
+        """Read only the status columns for an invoice (blocking)"""
+        cursor = self._read_conn().cursor()
+        cursor.execute('SELECT approval_status, payment_status FROM invoice_states WHERE invoice_number = ?', (invoice_number,))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def _lookup_thread_invoice_sync(self, thread_id: str) -> Optional[str]:
+        """Resolve the invoice number mapped to a Discord thread (blocking)"""
+        cursor = self._read_conn().cursor()
+        cursor.execute('SELECT invoice_number FROM thread_map WHERE thread_id = ?', (thread_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    async def _tx_info(self, tx_hash: str) -> Tuple[bool, float]:
+        """Fetch receipt status and value for a tx hash concurrently; successful results are cached."""
+        cached = self._tx_info_cache.get(tx_hash)
+        if cached is not None:
+            self._tx_info_cache.move_to_end(tx_hash)
+            return cached
+        success, amount_eth = await asyncio.gather(
+            self._run_io(check_transaction_success, tx_hash),
+            self._run_io(get_transaction_amount_eth, tx_hash)
+        )
+        # Only cache final successes; failures may be transient (pending tx, network error)
+        if success:
+            self._tx_info_cache[tx_hash] = (success, amount_eth)
+            if len(self._tx_info_cache) > self._tx_info_cache_max:
+                self._tx_info_cache.popitem(last=False)
+        return success, amount_eth
+    
+    def _render_status_embed_dict(self, state: InvoiceState) -> Dict[str, Any]:
+        """Render the status embed (minus the live SLA countdown and timestamp) as a Discord embed dict"""
         invoice_number = state['invoice_data']['Invoice Number']
         
         # Determine overall status
@@ -739,30 +1218,41 @@ class InvoiceApprovalAgent:
             overall_status = state['approval_status']
             status_color = 0xf39c12  # Orange
         
-        embed = discord.Embed(
-            title=f"📋 Invoice Status: {invoice_number}",
-            color=status_color
-        )
-        
-        embed.add_field(name="Overall Status", value=overall_status.upper(), inline=True)
-        embed.add_field(name="Approval Status", value=state['approval_status'].upper(), inline=True)
-        embed.add_field(name="Payment Status", value=state['payment_status'].upper(), inline=True)
-        if state['approval_status'] == 'pending':
-            time_remaining_text, _ = self._compute_time_remaining(state)
-            embed.add_field(name="Time Remaining", value=time_remaining_text, inline=True)
-        
+        fields = [
+            {"name": "Overall Status", "value": overall_status.upper(), "inline": True},
+            {"name": "Approval Status", "value": state['approval_status'].upper(), "inline": True},
+            {"name": "Payment Status", "value": state['payment_status'].upper(), "inline": True},
+        ]
         if state.get('approver'):
-            embed.add_field(name="Approver", value=state['approver'], inline=True)
+            fields.append({"name": "Approver", "value": state['approver'], "inline": True})
         if state.get('cost_center'):
-            embed.add_field(name="Cost Center", value=state['cost_center'], inline=True)
+            fields.append({"name": "Cost Center", "value": state['cost_center'], "inline": True})
         if state.get('transaction_id'):
-            embed.add_field(name="Transaction ID", value=state['transaction_id'], inline=True)
+            fields.append({"name": "Transaction ID", "value": state['transaction_id'], "inline": True})
         if state.get('rejection_reason'):
-            embed.add_field(name="Rejection Reason", value=state['rejection_reason'], inline=False)
-        
-        embed.set_footer(text=f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            fields.append({"name": "Rejection Reason", "value": state['rejection_reason'], "inline": False})
         
-        await self.safe_send(message.channel, embed=embed)
+        return {
+            "title": f"📋 Invoice Status: {invoice_number}",
+            "color": status_color,
+            "fields": fields,
+        }
+    
+    def _status_embed(self, state: InvoiceState) -> discord.Embed:
+        """Build the status embed from the cached dict, adding the live SLA countdown when pending"""
+        invoice_number = state['invoice_data']['Invoice Number']
+        embed_dict = self._cache_get_status_embed(invoice_number, state) or self._render_status_embed_dict(state)
+        # from_dict keeps the fields list by reference; copy it so the countdown stays out of the cache
+        embed = discord.Embed.from_dict({**embed_dict, 'fields': list(embed_dict['fields'])})
+        embed.set_footer(text=f"Last updated: {_fmt_now()}")
+        if state['approval_status'] == 'pending':
+            time_remaining_text, _ = self._compute_time_remaining(state)
+            embed.insert_field_at(3, name="Time Remaining", value=time_remaining_text, inline=True)
+        return embed
+    
+    async def show_invoice_status(self, message: discord.Message, state: InvoiceState):
+        """Show current status of the invoice"""
+        await self.safe_send(message.channel, embed=self._status_embed(state))
     
     async def process_approval_message(self, message: discord.Message, state: InvoiceState, decision: str):
         """Process approval or rejection message"""
@@ -779,11 +1269,7 @@ class InvoiceApprovalAgent:
                 state['cost_center'] = parts[1].strip()
                 
                 # Send confirmation
-                embed = discord.Embed(
-                    title="✅ Invoice Approved",
-                    description=f"Invoice {invoice_number} approved for cost center: {state['cost_center']}",
-                    color=0x27ae60
-                )
+                embed = _build_embed("approved", f"Invoice {invoice_number} approved for cost center: {state['cost_center']}")
                 await self.safe_send(message.channel, embed=embed)
             else:
                 # Ask for cost center
@@ -802,109 +1288,198 @@ class InvoiceApprovalAgent:
                 state['rejection_reason'] = 'No reason provided'
             
             # Send confirmation
-            embed = discord.Embed(
-                title="❌ Invoice Rejected",
-                description=f"Invoice {invoice_number} rejected: {state['rejection_reason']}",
-                color=0xe74c3c
-            )
+            embed = _build_embed("rejected", f"Invoice {invoice_number} rejected: {state['rejection_reason']}")
             await self.safe_send(message.channel, embed=embed)
         
         # Save state and update spreadsheet
-        self.save_state(invoice_number, state)
-        self.update_spreadsheet_row(state)
+        await self.save_state(invoice_number, state)
+        await self.update_spreadsheet_row(state)
+    
+    def _next_reminder_ts(self, state: InvoiceState) -> Optional[float]:
+        """Return the epoch time the next approval reminder is due, or None if none is scheduled"""
+        last_reminder = state.get('last_reminder')
+        if last_reminder:
+            base = datetime.fromisoformat(last_reminder)
+        elif state.get('reminder_count', 0) == 0:
+            # First reminder is measured from invoice submission
+            base = datetime.fromisoformat(state['invoice_data']['Timestamp'])
+        else:
+            return None
+        return (base + timedelta(hours=self.config.reminder_interval_hours)).timestamp()
+    
+    def _schedule_reminder(self, invoice_number: str, state: InvoiceState, immediate: bool = False):
+        """(Re)schedule the next SLA refresh/reminder for a pending invoice on the heap"""
+        if state.get('approval_status') != 'pending':
+            self._reminder_due.pop(invoice_number, None)
+            return
+        due = time.time() if immediate else time.time() + self._SLA_REFRESH_SECONDS
+        reminder_ts = self._next_reminder_ts(state)
+        if reminder_ts is not None:
+            due = min(due, reminder_ts)
+        self._reminder_due[invoice_number] = due
+        heapq.heappush(self._reminder_heap, (due, invoice_number))
+        if self._reminder_heap[0] == (due, invoice_number):
+            self._reminder_wakeup.set()
     
-    @tasks.loop(minutes=2)
     async def reminder_task(self):
-        """Background task to check for pending approvals needing reminders"""
+        """Background task sleeping until the earliest pending SLA refresh/reminder is due"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT invoice_number, state_json FROM invoice_states
-                WHERE state_json LIKE '%"approval_status": "pending"%'
-            ''')
-            
-            for invoice_number, state_json in cursor.fetchall():
-                state = json.loads(state_json)
-                # Update SLA message periodically
-                updated_state = await self.post_or_update_sla_message(state)
-                if updated_state is not None:
-                    state = updated_state
-                    self.save_state(invoice_number, state)
-                
-                # Check if reminder is due
-                last_reminder = state.get('last_reminder')
-                if last_reminder:
-                    last_reminder = datetime.fromisoformat(last_reminder)
-                    hours_since = (datetime.now() - last_reminder).total_seconds() / 3600
-                    if hours_since >= self.config.reminder_interval_hours:
-                        await self.send_reminder(state)
-                        state['reminder_count'] += 1
-                        state['last_reminder'] = datetime.now().isoformat()
-                        self.save_state(invoice_number, state)
-                elif state['reminder_count'] == 0:
-                    # First reminder after 24 hours
-                    created_time = datetime.fromisoformat(state['invoice_data']['Timestamp'])
-                    hours_since = (datetime.now() - created_time).total_seconds() / 3600
-                    if hours_since >= self.config.reminder_interval_hours:
-                        await self.send_reminder(state)
-                        state['reminder_count'] = 1
-                        state['last_reminder'] = datetime.now().isoformat()
-                        self.save_state(invoice_number, state)
-                        
+            # Rebuild the schedule once from the database
+            for invoice_number, state in await self._run_io(self._fetch_pending_states_sync):
+                self._schedule_reminder(invoice_number, state, immediate=True)
         except Exception as e:
-            logger.error(f"Error in reminder task: {e}")
+            logger.error(f"Failed to rebuild reminder schedule: {e}")
+        
+        while not self.shutting_down:
+            self._reminder_wakeup.clear()
+            timeout = self._reminder_heap[0][0] - time.time() if self._reminder_heap else 3600
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._reminder_wakeup.wait(), timeout)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await asyncio.wait_for(self._process_due_reminders(), self._REMINDER_TICK_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Reminder tick exceeded {self._REMINDER_TICK_TIMEOUT}s and was cancelled")
+            except Exception as e:
+                logger.error(f"Error in reminder task: {e}")
+    
+    async def _process_due_reminders(self):
+        """Pop every due heap entry and refresh SLA/send reminders for those invoices concurrently"""
+        now = time.time()
+        due_invoices: List[str] = []
+        # Earliest-due first, capped so one tick's wall-clock stays bounded
+        while (self._reminder_heap and self._reminder_heap[0][0] <= now
+               and len(due_invoices) < self.config.reminder_batch_size):
+            due, invoice_number = heapq.heappop(self._reminder_heap)
+            if self._reminder_due.get(invoice_number) != due:
+                continue  # superseded by a later reschedule
+            del self._reminder_due[invoice_number]
+            due_invoices.append(invoice_number)
+        if not due_invoices:
+            return
+        now_str = _fmt_now()
+        settled: set = set()
+        try:
+            # Discord calls inside are concurrency-capped by _discord_sem/_edit_sem, so the tick costs ~max, not sum
+            results = await asyncio.gather(
+                *(self._tick_one(invoice_number, now_str, settled) for invoice_number in due_invoices),
+                return_exceptions=True
+            )
+            for invoice_number, result in zip(due_invoices, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Reminder processing failed for {invoice_number}: {result}")
+        finally:
+            # Failed or cancelled (tick timeout) invoices retry on the next refresh cycle, not
+            # immediately, since an overdue reminder would otherwise spin
+            retry = time.time() + self._SLA_REFRESH_SECONDS
+            for invoice_number in due_invoices:
+                if invoice_number not in settled and invoice_number not in self._reminder_due:
+                    self._reminder_due[invoice_number] = retry
+                    heapq.heappush(self._reminder_heap, (retry, invoice_number))
+            # One transaction for every SLA/reminder update made this tick
+            await self.flush_states(due_invoices)
+    
+    async def _tick_one(self, invoice_number: str, now_str: str, settled: set):
+        """Process one due invoice and reschedule it, recording it in settled on success"""
+        state = await self.load_state(invoice_number)
+        if state and state.get('approval_status') == 'pending':
+            await self._process_pending_invoice(invoice_number, state, now_str)
+            if invoice_number not in self._reminder_due:
+                self._schedule_reminder(invoice_number, state)
+        settled.add(invoice_number)
+    
+    async def _process_pending_invoice(self, invoice_number: str, state: InvoiceState, now_str: Optional[str] = None):
+        """Refresh the SLA message and send a reminder if one is due (writes are deferred to the caller's flush)"""
+        # Update SLA message periodically (write coalesced with any reminder update below)
+        updated_state = await self.post_or_update_sla_message(state, now_str)
+        if updated_state is not None:
+            state = updated_state
+            await self.save_state(invoice_number, state, defer=True)
+        
+        # Check if reminder is due
+        last_reminder = state.get('last_reminder')
+        if last_reminder:
+            last_reminder = datetime.fromisoformat(last_reminder)
+            hours_since = (datetime.now() - last_reminder).total_seconds() / 3600
+            if hours_since >= self.config.reminder_interval_hours:
+                await self.send_reminder(state)
+                state['reminder_count'] += 1
+                state['last_reminder'] = datetime.now().isoformat()
+                await self.save_state(invoice_number, state, defer=True)
+        elif state['reminder_count'] == 0:
+            # First reminder after 24 hours
+            created_time = datetime.fromisoformat(state['invoice_data']['Timestamp'])
+            hours_since = (datetime.now() - created_time).total_seconds() / 3600
+            if hours_since >= self.config.reminder_interval_hours:
+                await self.send_reminder(state)
+                state['reminder_count'] = 1
+                state['last_reminder'] = datetime.now().isoformat()
+                await self.save_state(invoice_number, state, defer=True)
+    
+    def _fetch_pending_states_sync(self) -> List[Tuple[str, InvoiceState]]:
+        """Return (invoice_number, state) pairs still pending approval (blocking)"""
+        cursor = self._read_conn().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT * FROM invoice_states WHERE approval_status = 'pending'")
+        return [(row['invoice_number'], self._state_from_row(row)) for row in cursor.fetchall()]
     
     async def send_reminder(self, state: InvoiceState):
         """Send reminder to Discord thread"""
         thread = self.discord_client.get_channel(int(state['discord_thread_id']))
         if thread:
-            reminder_embed = discord.Embed(
-                title="⏰ Approval Reminder",
-                description=f"Invoice {state['invoice_data']['Invoice Number']} is still pending approval.",
-                color=0xf39c12
-            )
             time_remaining_text, _ = self._compute_time_remaining(state)
-            reminder_embed.add_field(
-                name="Time Elapsed",
-                value=f"Reminder #{state['reminder_count'] + 1}",
-                inline=True
-            )
-            reminder_embed.add_field(
-                name="Time Remaining",
-                value=time_remaining_text,
-                inline=True
-            )
-            reminder_embed.add_field(
-                name="Action Required",
-                value=f"<@&{self.config.approving_team_role_id}> Please review and respond.",
-                inline=False
+            reminder_embed = _build_embed(
+                "reminder",
+                f"Invoice {state['invoice_data']['Invoice Number']} is still pending approval.",
+                f"Reminder #{state['reminder_count'] + 1}",
+                time_remaining_text,
+                f"{self._role_mention} Please review and respond."
             )
             
             await self.safe_send(thread, embed=reminder_embed)
 
-    async def parse_message_with_llm(self, content: str, state: InvoiceState) -> Dict[str, Any]:
+    def _fast_parse_intent(self, content: str) -> Optional[Dict[str, Any]]:
+        """Classify obvious commands/tx hashes with regex; None means fall through to the LLM."""
+        parsed = {'intent': 'none', 'cost_center': None, 'reason': None, 'transaction_id': None}
+        if self._INTENT_RE['status'].match(content):
+            parsed['intent'] = 'status'
+            return parsed
+        match = self._INTENT_RE['approve'].match(content)
+        if match:
+            parsed['intent'] = 'approve'
+            # Rest of the line is the cost center, as with the old split(' ', 1)
+            cost_center = (match.group('cc') or '').strip(' \t\n,.;:-')
+            parsed['cost_center'] = cost_center or None
+            return parsed
+        match = self._INTENT_RE['reject'].match(content)
+        if match:
+            parsed['intent'] = 'reject'
+            parsed['reason'] = match.group('reason').strip() or None
+            return parsed
+        match = self._INTENT_RE['txhash'].search(content)
+        if match:
+            parsed['intent'] = 'payment'
+            parsed['transaction_id'] = match.group(0).lower()
+            return parsed
+        return None
+
+    async def parse_message_with_llm(self, content: str, invoice_number: str) -> Dict[str, Any]:
         """Parse freeform messages using the LLM into structured fields."""
-        system_prompt = (
-            "You are an assistant that extracts structured actions from approver messages in a Discord thread about an invoice.\n"
-            "Decide the user's intent among: approve, reject, status, payment, none.\n"
-            "- approve: The message approves the invoice, optionally specifying a cost center (examples: CC-123, 1001, COSTCENTER: 789).\n"
-            "- reject: The message rejects and may include a reason.\n"
-            "- status: The user asks for current status.\n"
-            "- payment: The user provides a transaction/reference/payment ID. If an Ethereum transaction hash is present (format: 0x followed by 64 hex characters), set intent=payment and extract ONLY that hash as transaction_id.\n"
-            "Rules:\n"
-            "1) When an Ethereum tx hash appears anywhere in the message, transaction_id MUST be that 0x... string (lowercased).\n"
-            "2) Ignore other text, numbers, or references when an Ethereum tx hash is present.\n"
-            "3) If multiple hashes appear, choose the first.\n"
-            "Output strict JSON with keys: intent, cost_center, reason, transaction_id. Use null when not present."
-        )
-        user_prompt = (
-            f"Invoice number: {state['invoice_data'].get('Invoice Number')}\n"
-            f"Message: {content}"
-        )
+        # The prompt's own rules make any embedded ETH hash the answer; skip the LLM round-trip
+        tx_match = _TX_HASH.search(content)
+        if tx_match:
+            return {'intent': 'payment', 'cost_center': None, 'reason': None, 'transaction_id': tx_match.group(0).lower()}
+        cached = self._llm_parse_cache.get(content)
+        if cached is not None:
+            self._llm_parse_cache.move_to_end(content)
+            return dict(cached)
         try:
-            response = await self.llm.ainvoke(f"{system_prompt}\n\n{user_prompt}")
+            response = await self._parse_chain.ainvoke({"invoice_number": invoice_number, "content": content})
             text = response.content if hasattr(response, 'content') else str(response)
-            json_match = re.search(r"\{[\s\S]*\}", text)
+            json_match = self._JSON_RE.search(text)
             if json_match:
                 parsed = json.loads(json_match.group(0))
             else:
@@ -914,6 +1489,9 @@ class InvoiceApprovalAgent:
                     parsed[key] = None
             if not parsed.get('intent'):
                 parsed['intent'] = 'none'
+            self._llm_parse_cache[content] = dict(parsed)
+            if len(self._llm_parse_cache) > self._llm_parse_cache_max:
+                self._llm_parse_cache.popitem(last=False)
             return parsed
         except Exception as e:
             logger.warning(f"LLM parsing failed, falling back to heuristics: {e}")
@@ -925,9 +1503,9 @@ class InvoiceApprovalAgent:
                 intent = 'approve'
             elif 'reject' in content_lower or 'rejected' in content_lower:
                 intent = 'reject'
-            cc_match = re.search(r"(cc[-\s:]?\s*\w+|cost\s*center[:\s]*\w+|\b\d{3,6}\b)", content, re.IGNORECASE)
+            cc_match = self._CC_RE.search(content)
             cost_center = cc_match.group(0) if cc_match else None
-            reason_match = re.search(r"(?:because|due to|reason[:\s])\s+(.+)$", content, re.IGNORECASE)
+            reason_match = self._REASON_RE.search(content)
             reason = reason_match.group(1).strip() if reason_match else None
             return {
                 'intent': intent,
@@ -947,7 +1525,7 @@ class InvoiceApprovalAgent:
         time_text = f"{hours}h {minutes}m" if seconds_remaining > 0 else "Expired"
         return time_text, seconds_remaining
 
-    async def post_or_update_sla_message(self, state: InvoiceState) -> Optional[InvoiceState]:
+    async def post_or_update_sla_message(self, state: InvoiceState, now_str: Optional[str] = None) -> Optional[InvoiceState]:
         """Post or update an SLA countdown message while awaiting approval."""
         if state['approval_status'] != 'pending':
             return None
@@ -958,26 +1536,37 @@ class InvoiceApprovalAgent:
         if not thread:
             return None
         time_text, _ = self._compute_time_remaining(state)
-        embed = discord.Embed(
-            title="🕒 Approval SLA",
-            description=f"Time remaining to approve invoice {state['invoice_data']['Invoice Number']}:",
-            color=0x95a5a6
-        )
-        embed.add_field(name="Remaining", value=time_text, inline=True)
-        embed.add_field(name="SLA (hours)", value=str(state.get('approval_sla_hours', self.config.approval_sla_hours)), inline=True)
-        embed.set_footer(text=f"Updated at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         message_id = state.get('sla_message_id')
+        cached = self._sla_msg_cache.get(message_id) if message_id else None
+        if cached is not None and cached[1] == time_text:
+            # Countdown text unchanged since the last edit: skip the API call
+            return None
+        embed = _build_embed(
+            "sla",
+            f"Time remaining to approve invoice {state['invoice_data']['Invoice Number']}:",
+            time_text,
+            str(state.get('approval_sla_hours', self.config.approval_sla_hours)),
+            footer=f"Updated at {now_str or _fmt_now()}"
+        )
         try:
             if message_id:
                 try:
-                    msg = await thread.fetch_message(int(message_id))
-                    await msg.edit(embed=embed)
+                    msg = cached[0] if cached is not None else None
+                    async with self._edit_sem, self._discord_sem:
+                        if msg is None:
+                            msg = await thread.fetch_message(int(message_id))
+                        await msg.edit(embed=embed)
                 except Exception:
+                    self._sla_msg_cache.pop(message_id, None)
                     msg = await self.safe_send(thread, embed=embed)
                     state['sla_message_id'] = str(msg.id)
             else:
                 msg = await self.safe_send(thread, embed=embed)
                 state['sla_message_id'] = str(msg.id)
+            self._sla_msg_cache[state['sla_message_id']] = (msg, time_text)
+            self._sla_msg_cache.move_to_end(state['sla_message_id'])
+            if len(self._sla_msg_cache) > self._sla_msg_cache_max:
+                self._sla_msg_cache.popitem(last=False)
         except Exception as e:
             logger.warning(f"Failed to post/update SLA message: {e}")
             return None
@@ -1022,8 +1611,27 @@ class InvoiceApprovalAgent:
     async def stop(self):
         """Stop the agent"""
         self.shutting_down = True
-        self.reminder_task.cancel()
+        if self._reminder_runner is not None:
+            self._reminder_runner.cancel()
+            # Let the cancelled tick run its final flush before the I/O pool goes away
+            await asyncio.gather(self._reminder_runner, return_exceptions=True)
+        if self._sheet_worker is not None and not self._sheet_worker.done():
+            # Drain queued spreadsheet updates before the I/O pool goes away
+            try:
+                await asyncio.wait_for(self._sheet_queue.join(), 30)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropped {len(self._sheet_pending)} queued spreadsheet updates on shutdown")
+            self._sheet_worker.cancel()
         await self.discord_client.close()
+        self._io_pool.shutdown(wait=True)
+        try:
+            self.conn.execute('PRAGMA optimize')
+        except sqlite3.Error as e:
+            logger.warning(f"PRAGMA optimize failed on shutdown: {e}")
+        with self._read_conns_lock:
+            for conn in self._read_conns:
+                conn.close()
+            self._read_conns.clear()
         self.conn.close()
 
 # Usage Example
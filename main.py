@@ -1,8 +1,9 @@
 from colorama import Fore, Style
 from src.graph import Workflow
 from dotenv import load_dotenv
+import asyncio
 import os
-import time
+import signal
 
 # Load all env variables
 load_dotenv()
@@ -52,6 +53,27 @@ initial_state = {
     }
 }
 
+async def _keep_alive(seconds: int) -> bool:
+    """Wait up to `seconds` without blocking background workers; returns True if interrupted by a signal"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows: Ctrl+C still raises KeyboardInterrupt
+    deadline = loop.time() + seconds
+    while (remaining := deadline - loop.time()) > 0:
+        try:
+            # Wake only for the 10s progress line or a shutdown signal
+            await asyncio.wait_for(stop.wait(), min(10, remaining))
+            return True
+        except asyncio.TimeoutError:
+            left = int(round(deadline - loop.time()))
+            if left > 0:
+                print(Fore.CYAN + f"Background wait: {left}s remaining" + Style.RESET_ALL)
+    return False
+
 # Run the automation
 print(Fore.GREEN + "Starting workflow..." + Style.RESET_ALL)
 
@@ -64,10 +86,8 @@ try:
     keep_alive_seconds = int(os.getenv("KEEP_ALIVE_SECONDS", "300"))
     if keep_alive_seconds > 0:
         print(Fore.CYAN + f"\nKeeping process alive for {keep_alive_seconds}s to allow background tasks to complete..." + Style.RESET_ALL)
-        for remaining in range(keep_alive_seconds, 0, -1):
-            time.sleep(1)
-            if remaining % 10 == 0 or remaining <= 5:
-                print(Fore.CYAN + f"Background wait: {remaining}s remaining" + Style.RESET_ALL)
+        if asyncio.run(_keep_alive(keep_alive_seconds)):
+            print(Fore.YELLOW + "\nShutting down gracefully..." + Style.RESET_ALL)
 
 except KeyboardInterrupt:
     print(Fore.YELLOW + "\nShutting down gracefully..." + Style.RESET_ALL)
@@ -7,16 +7,14 @@ from langchain_core.output_parsers import StrOutputParser
 from .structure import *
 from .prompts import *
 from dotenv import load_dotenv
+from functools import cached_property
 
 load_dotenv()
 
 class Agents:
     def __init__(self):
         llm = ChatOpenAI(model = "gpt-4o", temperature = 0)
-
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-        vectorstore = Chroma(persist_directory="db", embedding_function=embeddings)
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+        self._llm = llm
 
         email_category_prompt = PromptTemplate(
             template=CATEGORIZE_EMAIL_PROMPT, 
@@ -35,14 +33,6 @@ class Agents:
             llm.with_structured_output(RAGQueriesOutput)
         )
 
-        qa_prompt = ChatPromptTemplate.from_template(GENERATE_RAG_ANSWER_PROMPT)
-        self.generate_rag_answer = (
-            {"context" : retriever , "question": RunnablePassthrough()}
-            | qa_prompt 
-            | llm
-            | StrOutputParser
-        )
-
         writer_prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", EMAIL_WRITER_PROMPT),
@@ -63,3 +53,18 @@ class Agents:
             proofreader_prompt | 
             llm.with_structured_output(ProofReaderOutput) 
         )
+
+    @cached_property
+    def generate_rag_answer(self):
+        # Embeddings + Chroma are only opened on first RAG use, not for every Agents()
+        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        vectorstore = Chroma(persist_directory="db", embedding_function=embeddings)
+        retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
+
+        qa_prompt = ChatPromptTemplate.from_template(GENERATE_RAG_ANSWER_PROMPT)
+        return (
+            {"context" : retriever , "question": RunnablePassthrough()}
+            | qa_prompt 
+            | self._llm
+            | StrOutputParser()
+        )
@@ -3,24 +3,217 @@ import os
 import json
 from datetime import datetime
 from typing import List, Dict, Optional
+import queue
 import re
+import threading
+from contextlib import contextmanager
+
+try:
+    # Optional: one-pass multi-keyword scan
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+_INVOICE_KEYWORDS = (
+    'invoice', 'bill', 'payment', 'receipt', 'statement', 'charge',
+    'amount due', 'balance', 'outstanding', 'overdue', 'payment due',
+    'total amount', 'subtotal', 'tax', 'shipping', 'handling',
+    'invoice number', 'bill number', 'account number', 'reference number',
+    'due date', 'payment terms', 'net 30', 'net 60', 'net 90',
+    'credit card', 'bank transfer', 'wire transfer', 'check',
+    'vendor', 'supplier', 'merchant', 'service provider',
+    'subscription', 'recurring', 'monthly', 'quarterly', 'annual',
+    'pdf', 'attachment', 'document', 'file'
+)
+
+# Fallback single-pass scan: a zero-width lookahead reports the longest keyword starting at every
+# position (overlaps included); shorter keywords sharing that start are prefixes of it, so each hit
+# expands to every keyword it contains
+_KEYWORD_RE = re.compile(
+    '(?=(' + '|'.join(re.escape(k) for k in sorted(_INVOICE_KEYWORDS, key=len, reverse=True)) + '))',
+    re.IGNORECASE
+)
+_KEYWORDS_WITHIN = {kw: {k for k in _INVOICE_KEYWORDS if k in kw} for kw in _INVOICE_KEYWORDS}
+
+# Aho-Corasick automaton over all keywords: a single linear pass reports every (overlapping) hit
+if ahocorasick is not None:
+    _KW_AUTOMATON = ahocorasick.Automaton()
+    for _kw in _INVOICE_KEYWORDS:
+        _KW_AUTOMATON.add_word(_kw, _kw)
+    _KW_AUTOMATON.make_automaton()
+else:
+    _KW_AUTOMATON = None
+
+# Common invoice patterns as one case-insensitive alternation: a single scan of the raw text
+_INVOICE_PATTERN = re.compile('|'.join(f'(?:{p})' for p in (
+    r'\$[\d,]+\.?\d*',  # Dollar amounts
+    r'invoice\s*#?\s*\d+',  # Invoice numbers
+    r'bill\s*#?\s*\d+',  # Bill numbers
+    r'due\s+date[:\s]*\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Due dates
+    r'payment\s+due[:\s]*\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Payment due dates
+)), re.IGNORECASE)
+
+# Stable bit per keyword for the invoice_keywords INTEGER bitmap; append only, never reorder
+_KW_BITS: Dict[str, int] = {kw: bit for bit, kw in enumerate(_INVOICE_KEYWORDS + ('pattern_match',))}
+
+def _encode_keywords(keywords: List[str]) -> Optional[int]:
+    """Pack detected keywords into the invoice_keywords bitmap (None when nothing matched)."""
+    mask = 0
+    for kw in keywords:
+        mask |= 1 << _KW_BITS[kw]
+    return mask or None
+
+def _decode_keywords(value) -> List[str]:
+    """Unpack an invoice_keywords value; also accepts JSON text written by older versions."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        if value.startswith('['):
+            return json.loads(value)
+        # INTEGER written into a legacy TEXT-affinity column comes back as text
+        value = int(value)
+    return [kw for kw, bit in _KW_BITS.items() if value & (1 << bit)]
 
 class EmailDatabase:
     def __init__(self, db_path: str = "db/email_database.db"):
         """Initialize the email database."""
         self.db_path = db_path
+        # One long-lived connection shared by all methods, serialized by _lock
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # Invoice keyword classification runs on a background worker, off the insert path;
+        # rows are written with is_invoice_related NULL and filled in by the worker
+        self._classify_queue: "queue.Queue[tuple]" = queue.Queue()
+        self._classify_worker: Optional[threading.Thread] = None
+        self._classify_worker_lock = threading.Lock()
+        # email_id -> queued classifications not yet written, so readers can wait for just their row
+        self._pending_classification: Dict[str, int] = {}
+        self._classified = threading.Condition()
         self._ensure_db_directory()
         self._create_tables()
+        self._requeue_unclassified()
     
     def _ensure_db_directory(self):
         """Ensure the database directory exists."""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
     
+    def _get_conn(self) -> sqlite3.Connection:
+        """Return the shared connection, opening it with the write/cache PRAGMAs on first use."""
+        if self._conn is None:
+            # Larger prepared-statement cache: every method's SQL stays compiled on the shared connection
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=512)
+            # synchronous/temp_store/mmap_size are per connection; journal_mode=WAL persists in the file
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            conn.execute('PRAGMA mmap_size=268435456')
+            # C-level name access: rows convert straight to dicts, no per-row zip over cursor.description
+            conn.row_factory = sqlite3.Row
+            self._conn = conn
+        return self._conn
+    
+    @contextmanager
+    def _tx(self):
+        """Hold the lock on the shared connection; commit on success, roll back on error."""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    
+    # Most rows classified per UPDATE batch by the background worker
+    _CLASSIFY_BATCH_SIZE = 500
+    
+    def _enqueue_classification(self, items: List[tuple]):
+        """Queue (email_id, subject, body) tuples for background classification."""
+        with self._classified:
+            for email_id, _, _ in items:
+                self._pending_classification[email_id] = self._pending_classification.get(email_id, 0) + 1
+        for item in items:
+            self._classify_queue.put(item)
+        with self._classify_worker_lock:
+            if self._classify_worker is None or not self._classify_worker.is_alive():
+                self._classify_worker = threading.Thread(
+                    target=self._classify_loop, name="email-classifier", daemon=True
+                )
+                self._classify_worker.start()
+    
+    def _classify_loop(self):
+        """Drain the classification queue in batches, writing results with one executemany per batch."""
+        while True:
+            batch = [self._classify_queue.get()]
+            while len(batch) < self._CLASSIFY_BATCH_SIZE:
+                try:
+                    batch.append(self._classify_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                rows = []
+                for email_id, subject, body in batch:
+                    is_invoice_related, keywords = self._detect_invoice_keywords(subject, body)
+                    rows.append((is_invoice_related, _encode_keywords(keywords), email_id))
+                with self._tx() as conn:
+                    conn.executemany('UPDATE emails SET is_invoice_related = ?, invoice_keywords = ? WHERE id = ?', rows)
+            except Exception as e:
+                print(f"Error classifying emails: {e}")
+            finally:
+                with self._classified:
+                    for email_id, _, _ in batch:
+                        remaining = self._pending_classification.get(email_id, 1) - 1
+                        if remaining > 0:
+                            self._pending_classification[email_id] = remaining
+                        else:
+                            self._pending_classification.pop(email_id, None)
+                    self._classified.notify_all()
+                for _ in batch:
+                    self._classify_queue.task_done()
+    
+    def wait_for_classification(self, email_id: Optional[str] = None):
+        """Block until every queued email (or just email_id, when given) has been classified."""
+        if email_id is None:
+            self._classify_queue.join()
+            return
+        with self._classified:
+            self._classified.wait_for(lambda: email_id not in self._pending_classification)
+    
+    def _requeue_unclassified(self):
+        """Queue rows left unclassified by a previous run (e.g. the process exited mid-queue)."""
+        try:
+            with self._tx() as conn:
+                rows = conn.execute('SELECT id, subject, body FROM emails WHERE is_invoice_related IS NULL').fetchall()
+            if rows:
+                self._enqueue_classification([tuple(row) for row in rows])
+        except Exception as e:
+            print(f"Error re-queueing unclassified emails: {e}")
+    
+    def close(self):
+        """Finish queued classification and close the shared connection."""
+        if self._classify_worker is not None and self._classify_worker.is_alive():
+            self.wait_for_classification()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    # Bump when _create_tables gains a table, column, index or trigger so existing files re-run it
+    _SCHEMA_VERSION = 3
+    
     def _create_tables(self):
         """Create the necessary database tables."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._tx() as conn:
             cursor = conn.cursor()
             
+            # Schema and migrations already applied to this file: skip the DDL and table_info probes
+            if cursor.execute('PRAGMA user_version').fetchone()[0] >= self._SCHEMA_VERSION:
+                return
+            
+            # WAL: readers no longer block on the writer, and commits fsync once instead of twice
+            journal_mode = cursor.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+            if str(journal_mode).lower() != 'wal':
+                print(f"Warning: SQLite WAL mode not applied (journal_mode={journal_mode})")
+            
             # Emails table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS emails (
@@ -33,7 +226,7 @@ class EmailDatabase:
                     body TEXT NOT NULL,
                     received_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     is_invoice_related BOOLEAN DEFAULT FALSE,
-                    invoice_keywords TEXT,
+                    invoice_keywords INTEGER,
                     has_attachments BOOLEAN DEFAULT FALSE,
                     processed BOOLEAN DEFAULT FALSE
                 )
@@ -91,6 +284,41 @@ class EmailDatabase:
                 )
             ''')
             
+            # Google Drive metadata cache: folder listings and per-file metadata, kept current
+            # through the Drive changes feed (drive_sync holds each folder's page token)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS drive_files (
+                    id TEXT PRIMARY KEY,
+                    folder_id TEXT,
+                    name TEXT,
+                    mime_type TEXT,
+                    created_time TEXT,
+                    size INTEGER,
+                    modified_time TEXT,
+                    version TEXT,
+                    md5_checksum TEXT,
+                    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS drive_sync (
+                    folder_id TEXT PRIMARY KEY,
+                    page_token TEXT NOT NULL,
+                    complete BOOLEAN DEFAULT FALSE,
+                    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Pipeline results per Drive file revision: a repeat run with an unchanged md5 reuses them
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS processed_files (
+                    gdrive_id TEXT PRIMARY KEY,
+                    md5 TEXT NOT NULL,
+                    result_json TEXT NOT NULL,
+                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
             # Backfill/migrate missing columns on existing databases (safe idempotent ALTERs)
             try:
                 cursor.execute("PRAGMA table_info(attachments)")
@@ -104,82 +332,170 @@ class EmailDatabase:
                     cursor.execute("ALTER TABLE attachments ADD COLUMN gdrive_folder_id TEXT")
             except Exception as mig_e:
                 print(f"Warning: attachments table migration check failed: {mig_e}")
+            try:
+                cursor.execute("PRAGMA table_info(drive_files)")
+                if "md5_checksum" not in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute("ALTER TABLE drive_files ADD COLUMN md5_checksum TEXT")
+            except Exception as mig_e:
+                print(f"Warning: drive_files table migration check failed: {mig_e}")
+            
+            # Indexes for the hot lookup predicates (after the migration so gdrive_file_id exists)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_emails_invoice_processed ON emails(is_invoice_related, processed, received_date DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_att_gdrive ON attachments(gdrive_file_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_followups_due ON invoice_followups(resolved, reminder_sent, reminder_due_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_followups_gdrive ON invoice_followups(gdrive_file_id, resolved, id DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_drive_files_folder ON drive_files(folder_id, created_time DESC)')
             
+            # Flag the owning email when an attachment lands; no-op when already flagged
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_att_flag AFTER INSERT ON attachments
+                BEGIN
+                    UPDATE emails SET has_attachments = TRUE
+                    WHERE id = NEW.email_id AND has_attachments = FALSE;
+                END
+            ''')
+            
+            cursor.execute(f'PRAGMA user_version={self._SCHEMA_VERSION}')
             conn.commit()
     
+    _INSERT_EMAIL_SQL = '''
+        INSERT INTO emails 
+        (id, thread_id, message_id, email_references, sender, subject, body, is_invoice_related, invoice_keywords)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            thread_id = excluded.thread_id,
+            message_id = excluded.message_id,
+            email_references = excluded.email_references,
+            sender = excluded.sender,
+            subject = excluded.subject,
+            body = excluded.body,
+            is_invoice_related = excluded.is_invoice_related,
+            invoice_keywords = excluded.invoice_keywords
+    '''
+    _INSERT_ATTACHMENT_SQL = '''
+        INSERT INTO attachments 
+        (email_id, filename, original_filename, mime_type, file_path, file_size, 
+         category, file_hash, saved_date, gdrive_file_id, gdrive_folder_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    _INSERT_METADATA_SQL = '''
+        INSERT INTO invoice_metadata 
+        (email_id, invoice_number, amount, currency, due_date, vendor, extracted_data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''
+    # Rows per executemany/commit in the bulk methods
+    _BULK_CHUNK_SIZE = 10000
+    
+    @staticmethod
+    def _email_row(email_data: Dict) -> tuple:
+        """Build the emails row for an email dict; classification is filled in later by the worker."""
+        return (
+            email_data['id'],
+            email_data['threadId'],
+            email_data.get('messageId', ''),
+            email_data.get('references', ''),
+            email_data['sender'],
+            email_data['subject'],
+            email_data['body'],
+            None,
+            None
+        )
+    
+    @staticmethod
+    def _email_dict(row: sqlite3.Row) -> Dict:
+        """Convert an emails row to a dict, unpacking the invoice_keywords bitmap."""
+        email = dict(row)
+        email['invoice_keywords'] = _decode_keywords(email.get('invoice_keywords'))
+        return email
+    
+    @staticmethod
+    def _attachment_row(email_id: str, attachment_data: Dict) -> tuple:
+        """Build the attachments row for an attachment dict."""
+        return (
+            email_id,
+            attachment_data['filename'],
+            attachment_data.get('original_filename', ''),
+            attachment_data['mime_type'],
+            attachment_data['file_path'],
+            attachment_data.get('file_size', 0),
+            attachment_data.get('category', ''),
+            attachment_data.get('file_hash', ''),
+            attachment_data.get('saved_date', ''),
+            attachment_data.get('gdrive_file_id', ''),
+            attachment_data.get('gdrive_folder_id', '')
+        )
+    
+    @staticmethod
+    def _metadata_row(email_id: str, metadata: Dict) -> tuple:
+        """Build the invoice_metadata row for a metadata dict."""
+        return (
+            email_id,
+            metadata.get('invoice_number'),
+            metadata.get('amount'),
+            metadata.get('currency'),
+            metadata.get('due_date'),
+            metadata.get('vendor'),
+            json.dumps(metadata.get('extracted_data', {}))
+        )
+    
     def store_email(self, email_data: Dict) -> bool:
         """Store an email in the database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
-                
-                # Check if invoice-related
-                is_invoice_related, keywords = self._detect_invoice_keywords(
-                    email_data.get('subject', '') + ' ' + email_data.get('body', '')
-                )
-                
-                cursor.execute('''
-                    INSERT OR REPLACE INTO emails 
-                    (id, thread_id, message_id, email_references, sender, subject, body, is_invoice_related, invoice_keywords)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    email_data['id'],
-                    email_data['threadId'],
-                    email_data.get('messageId', ''),
-                    email_data.get('references', ''),
-                    email_data['sender'],
-                    email_data['subject'],
-                    email_data['body'],
-                    is_invoice_related,
-                    json.dumps(keywords) if keywords else None
-                ))
-                
+                cursor.execute(self._INSERT_EMAIL_SQL, self._email_row(email_data))
                 conn.commit()
-                return True
+            self._enqueue_classification([
+                (email_data['id'], email_data.get('subject', ''), email_data.get('body', ''))
+            ])
+            return True
         except Exception as e:
             print(f"Error storing email: {e}")
             return False
     
-    def _detect_invoice_keywords(self, text: str) -> tuple[bool, List[str]]:
-        """Detect invoice-related keywords in text."""
-        invoice_keywords = [
-            'invoice', 'bill', 'payment', 'receipt', 'statement', 'charge',
-            'amount due', 'balance', 'outstanding', 'overdue', 'payment due',
-            'total amount', 'subtotal', 'tax', 'shipping', 'handling',
-            'invoice number', 'bill number', 'account number', 'reference number',
-            'due date', 'payment terms', 'net 30', 'net 60', 'net 90',
-            'credit card', 'bank transfer', 'wire transfer', 'check',
-            'vendor', 'supplier', 'merchant', 'service provider',
-            'subscription', 'recurring', 'monthly', 'quarterly', 'annual',
-            'pdf', 'attachment', 'document', 'file'
-        ]
+    def _detect_invoice_keywords(self, subject: str, body: str = '') -> tuple[bool, List[str]]:
+        """Detect invoice-related keywords in an email's subject and body.
         
-        text_lower = text.lower()
-        found_keywords = []
+        Subject and body are scanned separately rather than concatenated.
+        """
+        texts = [t for t in (subject, body) if t and not t.isspace()]
+        if not texts:
+            return False, []
         
-        for keyword in invoice_keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
+        hits = set()
+        pattern_hit = False
+        for text in texts:
+            if _KW_AUTOMATON is not None:
+                hits.update(kw for _, kw in _KW_AUTOMATON.iter(text.lower()))
+            else:
+                for longest in {m.group(1).lower() for m in _KEYWORD_RE.finditer(text)}:
+                    hits |= _KEYWORDS_WITHIN[longest]
+            # Also check for common invoice patterns
+            pattern_hit = pattern_hit or _INVOICE_PATTERN.search(text) is not None
+        # Report in keyword-list order, as the substring loop does
+        found_keywords = [kw for kw in _INVOICE_KEYWORDS if kw in hits]
         
-        # Also check for common invoice patterns
-        patterns = [
-            r'\$[\d,]+\.?\d*',  # Dollar amounts
-            r'invoice\s*#?\s*\d+',  # Invoice numbers
-            r'bill\s*#?\s*\d+',  # Bill numbers
-            r'due\s+date[:\s]*\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Due dates
-            r'payment\s+due[:\s]*\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',  # Payment due dates
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, text_lower):
-                found_keywords.append('pattern_match')
+        if pattern_hit:
+            found_keywords.append('pattern_match')
         
         return len(found_keywords) > 0, found_keywords
     
+    def is_invoice_related(self, email_id: str) -> bool:
+        """Return whether a stored email is invoice-related, waiting for queued classification first."""
+        self.wait_for_classification(email_id)
+        try:
+            with self._tx() as conn:
+                row = conn.execute('SELECT is_invoice_related FROM emails WHERE id = ?', (email_id,)).fetchone()
+                return bool(row and row[0])
+        except Exception as e:
+            print(f"Error checking invoice status: {e}")
+            return False
+    
     def get_invoice_related_emails(self) -> List[Dict]:
         """Get all invoice-related emails."""
+        self.wait_for_classification()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM emails 
@@ -187,8 +503,7 @@ class EmailDatabase:
                     ORDER BY received_date DESC
                 ''')
                 
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return [self._email_dict(row) for row in cursor]
         except Exception as e:
             print(f"Error retrieving invoice emails: {e}")
             return []
@@ -196,34 +511,11 @@ class EmailDatabase:
     def store_attachment(self, email_id: str, attachment_data: Dict) -> bool:
         """Store attachment information in the database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT INTO attachments 
-                    (email_id, filename, original_filename, mime_type, file_path, file_size, 
-                     category, file_hash, saved_date, gdrive_file_id, gdrive_folder_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    email_id,
-                    attachment_data['filename'],
-                    attachment_data.get('original_filename', ''),
-                    attachment_data['mime_type'],
-                    attachment_data['file_path'],
-                    attachment_data.get('file_size', 0),
-                    attachment_data.get('category', ''),
-                    attachment_data.get('file_hash', ''),
-                    attachment_data.get('saved_date', ''),
-                    attachment_data.get('gdrive_file_id', ''),
-                    attachment_data.get('gdrive_folder_id', '')
-                ))
-                
-                # Update email to indicate it has attachments
-                cursor.execute('''
-                    UPDATE emails 
-                    SET has_attachments = TRUE 
-                    WHERE id = ?
-                ''', (email_id,))
+                # trg_att_flag sets emails.has_attachments
+                cursor.execute(self._INSERT_ATTACHMENT_SQL, self._attachment_row(email_id, attachment_data))
                 
                 conn.commit()
                 return True
@@ -234,22 +526,10 @@ class EmailDatabase:
     def store_invoice_metadata(self, email_id: str, metadata: Dict) -> bool:
         """Store invoice metadata in the database."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT INTO invoice_metadata 
-                    (email_id, invoice_number, amount, currency, due_date, vendor, extracted_data)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    email_id,
-                    metadata.get('invoice_number'),
-                    metadata.get('amount'),
-                    metadata.get('currency'),
-                    metadata.get('due_date'),
-                    metadata.get('vendor'),
-                    json.dumps(metadata.get('extracted_data', {}))
-                ))
+                cursor.execute(self._INSERT_METADATA_SQL, self._metadata_row(email_id, metadata))
                 
                 conn.commit()
                 return True
@@ -257,10 +537,25 @@ class EmailDatabase:
             print(f"Error storing invoice metadata: {e}")
             return False
     
+    def store_attachments_bulk(self, attachments: List[tuple]) -> bool:
+        """Store many (email_id, attachment_data) pairs with one connection and one commit per chunk."""
+        try:
+            with self._tx() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(attachments), self._BULK_CHUNK_SIZE):
+                    chunk = attachments[start:start + self._BULK_CHUNK_SIZE]
+                    # trg_att_flag flags the owning emails as having attachments
+                    cursor.executemany(self._INSERT_ATTACHMENT_SQL, [self._attachment_row(eid, a) for eid, a in chunk])
+                    conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error storing attachments in bulk: {e}")
+            return False
+    
     def mark_email_processed(self, email_id: str) -> bool:
         """Mark an email as processed."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE emails 
@@ -275,8 +570,9 @@ class EmailDatabase:
     
     def get_unprocessed_invoice_emails(self) -> List[Dict]:
         """Get unprocessed invoice-related emails."""
+        self.wait_for_classification()
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM emails 
@@ -284,8 +580,7 @@ class EmailDatabase:
                     ORDER BY received_date DESC
                 ''')
                 
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return [self._email_dict(row) for row in cursor]
         except Exception as e:
             print(f"Error retrieving unprocessed invoice emails: {e}")
             return []
@@ -293,10 +588,10 @@ class EmailDatabase:
     def get_email_by_gdrive_file_id(self, gdrive_file_id: str) -> Optional[Dict]:
         """Get the originating email for a given Google Drive file ID via attachments table."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT e.*
+                    SELECT e.id
                     FROM attachments a
                     JOIN emails e ON a.email_id = e.id
                     WHERE a.gdrive_file_id = ?
@@ -304,25 +599,25 @@ class EmailDatabase:
                     LIMIT 1
                 ''', (gdrive_file_id,))
                 row = cursor.fetchone()
-                if not row:
-                    return None
-                columns = [description[0] for description in cursor.description]
-                return dict(zip(columns, row))
+            if not row:
+                return None
+            # Read the row once its queued classification has been written
+            return self.get_email_by_id(row[0])
         except Exception as e:
             print(f"Error retrieving email by gdrive_file_id: {e}")
             return None
 
     def get_email_by_id(self, email_id: str) -> Optional[Dict]:
-        """Retrieve an email row by its ID."""
+        """Retrieve an email row by its ID, waiting for its queued classification first."""
+        self.wait_for_classification(email_id)
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM emails WHERE id = ? LIMIT 1', (email_id,))
                 row = cursor.fetchone()
                 if not row:
                     return None
-                columns = [description[0] for description in cursor.description]
-                return dict(zip(columns, row))
+                return self._email_dict(row)
         except Exception as e:
             print(f"Error retrieving email by id: {e}")
             return None
@@ -330,12 +625,13 @@ class EmailDatabase:
     def create_followup(self, email_id: str, thread_id: str, gdrive_file_id: str, missing_fields: Dict, initial_notice_sent_at: str, reminder_due_at: str) -> Optional[int]:
         """Create a follow-up record for an invoice with missing information."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO invoice_followups
                     (email_id, thread_id, gdrive_file_id, missing_fields, initial_notice_sent_at, reminder_due_at, reminder_sent, resolved)
                     VALUES (?, ?, ?, ?, ?, ?, FALSE, FALSE)
+                    RETURNING id
                 ''', (
                     email_id,
                     thread_id,
@@ -344,8 +640,10 @@ class EmailDatabase:
                     initial_notice_sent_at,
                     reminder_due_at
                 ))
+                # RETURNING rows must be fetched before the commit
+                row = cursor.fetchone()
                 conn.commit()
-                return cursor.lastrowid
+                return row[0] if row else None
         except Exception as e:
             print(f"Error creating followup: {e}")
             return None
@@ -353,7 +651,7 @@ class EmailDatabase:
     def get_due_followups(self, now_iso: str) -> List[Dict]:
         """Return follow-ups that are due for reminder and not yet resolved/sent."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, email_id, thread_id, gdrive_file_id, missing_fields, initial_notice_sent_at, reminder_due_at, reminder_sent, resolved
@@ -362,9 +660,7 @@ class EmailDatabase:
                       AND reminder_sent = FALSE
                       AND reminder_due_at <= ?
                 ''', (now_iso,))
-                rows = cursor.fetchall()
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, r)) for r in rows]
+                return [dict(row) for row in cursor]
         except Exception as e:
             print(f"Error retrieving due followups: {e}")
             return []
@@ -372,7 +668,7 @@ class EmailDatabase:
     def mark_followup_reminder_sent(self, followup_id: int, sent_at_iso: str) -> bool:
         """Mark a follow-up as reminder sent."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE invoice_followups
@@ -386,10 +682,29 @@ class EmailDatabase:
             print(f"Error marking followup reminder sent: {e}")
             return False
 
+    def mark_followups_reminder_sent_bulk(self, followup_ids: List[int], sent_at_iso: str) -> int:
+        """Mark many follow-ups as reminder sent in one transaction; returns the number of rows updated."""
+        if not followup_ids:
+            return 0
+        try:
+            with self._tx() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    UPDATE invoice_followups
+                    SET reminder_sent = TRUE,
+                        reminder_sent_at = ?
+                    WHERE id = ?
+                ''', [(sent_at_iso, followup_id) for followup_id in followup_ids])
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Error marking followup reminders sent: {e}")
+            return 0
+
     def mark_followup_resolved(self, followup_id: int) -> bool:
         """Mark a follow-up as resolved (a reply was detected)."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE invoice_followups
@@ -405,7 +720,7 @@ class EmailDatabase:
     def get_open_followup_by_file_id(self, gdrive_file_id: str) -> Optional[Dict]:
         """Return an unresolved follow-up for a given Google Drive file ID, if any."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._tx() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, email_id, thread_id, gdrive_file_id, missing_fields, initial_notice_sent_at, reminder_due_at, reminder_sent, resolved
@@ -418,8 +733,166 @@ class EmailDatabase:
                 row = cursor.fetchone()
                 if not row:
                     return None
-                columns = [description[0] for description in cursor.description]
-                return dict(zip(columns, row))
+                return dict(row)
         except Exception as e:
             print(f"Error retrieving open followup by file id: {e}")
             return None
+
+    def get_drive_file(self, file_id: str) -> Optional[Dict]:
+        """Return cached Drive metadata for a file ID (Drive API field names), or None."""
+        try:
+            with self._tx() as conn:
+                row = conn.execute(
+                    'SELECT id, name, mime_type, created_time, size, md5_checksum FROM drive_files WHERE id = ?', (file_id,)
+                ).fetchone()
+                return self._drive_file_dict(row) if row else None
+        except Exception as e:
+            print(f"Error retrieving cached Drive file: {e}")
+            return None
+
+    def get_drive_folder_files(self, folder_id: str, limit: int) -> List[Dict]:
+        """Return the newest cached files of a Drive folder, newest first."""
+        try:
+            with self._tx() as conn:
+                cursor = conn.execute('''
+                    SELECT id, name, mime_type, created_time, size, md5_checksum FROM drive_files
+                    WHERE folder_id = ?
+                    ORDER BY created_time DESC
+                    LIMIT ?
+                ''', (folder_id, limit))
+                return [self._drive_file_dict(row) for row in cursor]
+        except Exception as e:
+            print(f"Error retrieving cached Drive folder: {e}")
+            return []
+
+    @staticmethod
+    def _drive_file_dict(row: sqlite3.Row) -> Dict:
+        """Cached drive_files row -> the dict shape files().list/get return."""
+        file = {'id': row['id'], 'name': row['name'], 'mimeType': row['mime_type'], 'createdTime': row['created_time']}
+        if row['size'] is not None:
+            file['size'] = str(row['size'])
+        if row['md5_checksum']:
+            file['md5Checksum'] = row['md5_checksum']
+        return file
+
+    def upsert_drive_files(self, files: List[Dict], folder_id: Optional[str] = None) -> bool:
+        """Cache Drive file metadata dicts; a None folder_id keeps the folder already recorded."""
+        if not files:
+            return True
+        try:
+            with self._tx() as conn:
+                conn.executemany('''
+                    INSERT INTO drive_files (id, folder_id, name, mime_type, created_time, size, modified_time, version, md5_checksum, cached_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(id) DO UPDATE SET
+                        folder_id = COALESCE(excluded.folder_id, drive_files.folder_id),
+                        name = excluded.name,
+                        mime_type = excluded.mime_type,
+                        created_time = COALESCE(excluded.created_time, drive_files.created_time),
+                        size = COALESCE(excluded.size, drive_files.size),
+                        modified_time = COALESCE(excluded.modified_time, drive_files.modified_time),
+                        version = COALESCE(excluded.version, drive_files.version),
+                        md5_checksum = COALESCE(excluded.md5_checksum, drive_files.md5_checksum),
+                        cached_at = CURRENT_TIMESTAMP
+                ''', [(
+                    f['id'],
+                    folder_id,
+                    f.get('name'),
+                    f.get('mimeType'),
+                    f.get('createdTime'),
+                    int(f['size']) if f.get('size') else None,
+                    f.get('modifiedTime'),
+                    f.get('version'),
+                    f.get('md5Checksum'),
+                ) for f in files])
+                return True
+        except Exception as e:
+            print(f"Error caching Drive files: {e}")
+            return False
+
+    def delete_drive_files(self, file_ids: List[str], folder_id: Optional[str] = None) -> int:
+        """Drop Drive files from the cache (deleted, trashed or 404), or only their entries under folder_id
+        (moved out of it); returns rows removed."""
+        if not file_ids:
+            return 0
+        try:
+            with self._tx() as conn:
+                if folder_id is None:
+                    cursor = conn.executemany('DELETE FROM drive_files WHERE id = ?', [(i,) for i in file_ids])
+                else:
+                    cursor = conn.executemany(
+                        'DELETE FROM drive_files WHERE id = ? AND folder_id = ?', [(i, folder_id) for i in file_ids]
+                    )
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Error removing cached Drive files: {e}")
+            return 0
+
+    def get_drive_sync(self, folder_id: str) -> Optional[Dict]:
+        """Return the changes-feed page token and completeness flag recorded for a folder."""
+        try:
+            with self._tx() as conn:
+                row = conn.execute(
+                    'SELECT page_token, complete FROM drive_sync WHERE folder_id = ?', (folder_id,)
+                ).fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            print(f"Error retrieving Drive sync token: {e}")
+            return None
+
+    def set_drive_sync(self, folder_id: str, page_token: str, complete: Optional[bool] = None) -> bool:
+        """Record a folder's changes-feed page token; complete=None keeps the stored flag."""
+        try:
+            with self._tx() as conn:
+                conn.execute('''
+                    INSERT INTO drive_sync (folder_id, page_token, complete, synced_at)
+                    VALUES (?, ?, COALESCE(?, FALSE), CURRENT_TIMESTAMP)
+                    ON CONFLICT(folder_id) DO UPDATE SET
+                        page_token = excluded.page_token,
+                        complete = COALESCE(?, drive_sync.complete),
+                        synced_at = CURRENT_TIMESTAMP
+                ''', (folder_id, page_token, complete, complete))
+                return True
+        except Exception as e:
+            print(f"Error recording Drive sync token: {e}")
+            return False
+
+    def clear_drive_folder(self, folder_id: str) -> bool:
+        """Forget a folder's cached listing and sync token so the next call re-lists it."""
+        try:
+            with self._tx() as conn:
+                conn.execute('DELETE FROM drive_files WHERE folder_id = ?', (folder_id,))
+                conn.execute('DELETE FROM drive_sync WHERE folder_id = ?', (folder_id,))
+                return True
+        except Exception as e:
+            print(f"Error clearing cached Drive folder: {e}")
+            return False
+
+    def get_processed_result(self, gdrive_id: str, md5: str) -> Optional[Dict]:
+        """Return the stored pipeline result for a Drive file if its content (md5) is unchanged."""
+        try:
+            with self._tx() as conn:
+                row = conn.execute(
+                    'SELECT result_json FROM processed_files WHERE gdrive_id = ? AND md5 = ?', (gdrive_id, md5)
+                ).fetchone()
+                return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"Error retrieving processed result: {e}")
+            return None
+
+    def store_processed_result(self, gdrive_id: str, md5: str, result: Dict) -> bool:
+        """Record the pipeline result for a Drive file revision, replacing any older revision's."""
+        try:
+            with self._tx() as conn:
+                conn.execute('''
+                    INSERT INTO processed_files (gdrive_id, md5, result_json, processed_at)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(gdrive_id) DO UPDATE SET
+                        md5 = excluded.md5,
+                        result_json = excluded.result_json,
+                        processed_at = CURRENT_TIMESTAMP
+                ''', (gdrive_id, md5, json.dumps(result, default=str)))
+                return True
+        except Exception as e:
+            print(f"Error storing processed result: {e}")
+            return False
@@ -1,9 +1,8 @@
 import os
 import threading
 import asyncio
-import time
 from concurrent.futures import Future
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
 # Import agent class from root discord1.py
@@ -14,10 +13,15 @@ _agent: Optional[InvoiceApprovalAgent] = None
 _loop: Optional[asyncio.AbstractEventLoop] = None
 _thread: Optional[threading.Thread] = None
 _start_future: Optional[Future] = None
+# Invoices submitted from worker threads, drained on the loop in one hop per burst
+_pending_lock = threading.Lock()
+_pending: List[Tuple[Dict, Future]] = []
 
 
-def _run_loop(loop: asyncio.AbstractEventLoop):
+def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
     asyncio.set_event_loop(loop)
+    # Runs on the first loop iteration, i.e. once the loop is actually running
+    loop.call_soon(ready.set)
     loop.run_forever()
 
 
@@ -43,13 +47,12 @@ def ensure_started() -> None:
         _agent = InvoiceApprovalAgent(cfg)
         # Start asyncio loop in background
         _loop = asyncio.new_event_loop()
-        _thread = threading.Thread(target=_run_loop, args=(_loop,), daemon=True)
+        ready = threading.Event()
+        _thread = threading.Thread(target=_run_loop, args=(_loop, ready), daemon=True)
         _thread.start()
         # Wait until the loop is running to avoid "no running event loop" race
-        for _ in range(500):  # up to ~5 seconds
-            if _loop.is_running():
-                break
-            time.sleep(0.01)
+        if not ready.wait(timeout=5.0):
+            logging.warning("Background event loop did not signal readiness within 5s")
         # Start Discord client on the background loop
         try:
             fut = asyncio.run_coroutine_threadsafe(_agent.start(), _loop)
@@ -73,8 +76,47 @@ def ensure_started() -> None:
             print("✓ Discord agent start scheduled on background loop")
 
 
+async def _process_submission(invoice_data: Dict, fut: Future) -> None:
+    if not fut.set_running_or_notify_cancel():
+        return
+    try:
+        fut.set_result(await _agent.process_invoice(invoice_data))
+    except BaseException as e:
+        fut.set_exception(e)
+
+
+def _drain_pending() -> None:
+    """Runs on the loop: take every queued submission and process them concurrently."""
+    with _pending_lock:
+        batch = _pending[:]
+        _pending.clear()
+    for invoice_data, fut in batch:
+        _loop.create_task(_process_submission(invoice_data, fut))
+
+
 def submit_invoice(invoice_data: Dict) -> Future:
     """Submit an invoice to the Discord agent workflow. Returns a Future for the result message."""
     ensure_started()
     assert _agent is not None and _loop is not None
-    return asyncio.run_coroutine_threadsafe(_agent.process_invoice(invoice_data), _loop)
+    fut: Future = Future()
+    with _pending_lock:
+        _pending.append((invoice_data, fut))
+        # Only the first submission of a burst wakes the loop; the rest ride along in the same drain
+        wake = len(_pending) == 1
+    if wake:
+        _loop.call_soon_threadsafe(_drain_pending)
+    return fut
+
+
+def run_coroutine(coro) -> Future:
+    """Schedule coro on the agent's background loop; returns a Future for its result."""
+    ensure_started()
+    assert _loop is not None
+    return asyncio.run_coroutine_threadsafe(coro, _loop)
+
+
+def add_state_listener(callback: Callable[[str], None]) -> None:
+    """Run callback(invoice_number) whenever the agent commits that invoice's state row."""
+    ensure_started()
+    assert _agent is not None
+    _agent.add_state_listener(callback)
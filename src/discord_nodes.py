@@ -1,23 +1,67 @@
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 import logging
 import os
+import asyncio
 import sqlite3
 import json
+import atexit
+import functools
+import itertools
+import threading
 from datetime import datetime
 import time
 from colorama import Fore, Style
 
+try:
+    # Optional: faster parsing of the invoice_data_json column
+    import orjson
+except ImportError:
+    orjson = None
+
 from .utils import log_state
 
 try:
     # Prefer package-relative import
-    from .discord_integration import ensure_started, submit_invoice
+    from .discord_integration import ensure_started, submit_invoice, add_state_listener, run_coroutine
 except Exception:
     # Fallback for different import contexts
-    from src.discord_integration import ensure_started, submit_invoice
+    from src.discord_integration import ensure_started, submit_invoice, add_state_listener, run_coroutine
 
 logger = logging.getLogger(__name__)
 
+# Re-poll schedule (seconds) for state waits: quick re-reads early, then a slow fallback. Notifications
+# from the in-process agent wake waiters immediately; the re-reads cover an agent running elsewhere
+# (e.g. discord1.py started on its own), whose writes this process is never told about.
+_POLL_BACKOFF_STEPS = (1, 2, 4, 8)
+_POLL_BACKOFF_CEILING = 30
+
+
+def _poll_backoff():
+    return itertools.chain(_POLL_BACKOFF_STEPS, itertools.repeat(_POLL_BACKOFF_CEILING))
+
+
+@functools.lru_cache(maxsize=1)
+def _discord_configured() -> bool:
+    """Probe the Discord/Sheets environment once per process (env lookups plus a credentials-file stat)."""
+    # Minimal required environment
+    required = [
+        os.getenv("DISCORD_TOKEN"),
+        os.getenv("DISCORD_CHANNEL_ID"),
+        os.getenv("APPROVING_TEAM_ROLE_ID"),
+        os.getenv("OPENAI_API_KEY"),
+    ]
+    sheets_file = os.getenv("GOOGLE_SHEETS_CREDENTIALS_FILE", "g_sheets.json")
+    spreadsheet_id = os.getenv("SPREADSHEET_ID")
+
+    if not all(required):
+        return False
+    if not spreadsheet_id:
+        return False
+    if not os.path.exists(sheets_file):
+        return False
+    return True
+
 
 class DiscordNodes:
     """
@@ -37,29 +81,37 @@ class DiscordNodes:
         self.wait_seconds = int(os.getenv("DISCORD_APPROVAL_WAIT_SECONDS", "900"))  # default 15 min
         self.poll_interval = int(os.getenv("DISCORD_POLL_INTERVAL_SECONDS", "10"))  # default 10s
         self.payment_wait_seconds = int(os.getenv("DISCORD_PAYMENT_WAIT_SECONDS", "900"))  # default 15 min
+        # Bounded wait in create_discord_thread for the agent to persist the posted thread (or fail).
+        # The graph ends on "pending", so a failure that lands after this wait only reaches the
+        # failure policy if something re-runs check_discord_approval; 0 skips the wait entirely
+        self.thread_wait_seconds = float(os.getenv("DISCORD_THREAD_WAIT_SECONDS", "30"))
+        # In-flight agent submissions by invoice number (futures resolved on the agent loop)
+        self._submissions: Dict[str, Any] = {}
+        # Waiters by invoice number (one Event each), woken by the agent's state-write notifications
+        self._state_events: Dict[str, List[threading.Event]] = {}
+        self._state_events_lock = threading.Lock()
+        # Async waiters by invoice number: (their event loop, asyncio.Event) pairs
+        self._async_state_events: Dict[str, List[tuple]] = {}
+        self._listener_registered = False
+        # One long-lived read connection to the agent's state DB, opened on first fetch
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Pending single-invoice lookups, drained together by the next caller holding _db_lock
+        self._fetch_queue: Dict[str, List[Dict[str, Any]]] = {}
+        self._fetch_queue_lock = threading.Lock()
+        # invoice_number -> (last row tuple, built agent state): unchanged rows skip the dict build and JSON parse.
+        # LRU-bounded; only touched under _db_lock
+        self._agent_state_cache: "OrderedDict[str, tuple]" = OrderedDict()
         if self.enabled:
             print(f"{Fore.GREEN}Discord integration enabled (agent mode){Style.RESET_ALL}")
         else:
             print(f"{Fore.YELLOW}Using simplified Discord nodes (no actual Discord integration){Style.RESET_ALL}")
 
     def _is_configured(self) -> bool:
-        # Minimal required environment
-        required = [
-            os.getenv("DISCORD_TOKEN"),
-            os.getenv("DISCORD_CHANNEL_ID"),
-            os.getenv("APPROVING_TEAM_ROLE_ID"),
-            os.getenv("OPENAI_API_KEY"),
-        ]
-        sheets_file = os.getenv("GOOGLE_SHEETS_CREDENTIALS_FILE", "g_sheets.json")
-        spreadsheet_id = os.getenv("SPREADSHEET_ID")
-
-        if not all(required):
-            return False
-        if not spreadsheet_id:
-            return False
-        if not os.path.exists(sheets_file):
-            return False
-        return True
+        # DISCORD_CONFIG_RELOAD=1 re-probes the environment (e.g. after editing .env during development)
+        if os.getenv("DISCORD_CONFIG_RELOAD", "").lower() in ("1", "true", "yes", "on"):
+            _discord_configured.cache_clear()
+        return _discord_configured()
 
     def _map_invoice_payload(self, invoice_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
@@ -83,23 +135,179 @@ class DiscordNodes:
             "Account Number/IBAN": pd.get("account_number", ""),
         }
 
-    def _fetch_state_from_db(self, invoice_number: str) -> Optional[Dict[str, Any]]:
-        """Read the latest agent state from the local SQLite DB (invoice_states.db)."""
+    # Bound on host parameters per IN (...) query
+    _FETCH_CHUNK_SIZE = 500
+    # Bound on invoices kept in _agent_state_cache
+    _STATE_CACHE_MAX = 512
+
+    def _state_db(self) -> sqlite3.Connection:
+        """Return the shared read connection to invoice_states.db, opening it on first use (call under _db_lock)."""
+        if self._db is None:
+            conn = sqlite3.connect("invoice_states.db", check_same_thread=False, isolation_level=None)
+            # The agent owns the schema and all writes; WAL lets these reads run beside its writer
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA query_only=ON")
+            # Plain tuples: column positions are resolved once per query from cursor.description
+            conn.row_factory = None
+            atexit.register(conn.close)
+            self._db = conn
+        return self._db
+
+    def _state_from_row(self, row: tuple, fields: List[tuple], inv_idx: int, data_idx: int) -> Dict[str, Any]:
+        """
+        Build the agent state dict from an invoice_states row. A row identical to the last one seen for the
+        invoice returns the previously built dict (shared; callers only read it).
+        """
+        invoice_number = row[inv_idx]
+        cached = self._agent_state_cache.get(invoice_number)
+        # Exact tuple compare (memcmp for the JSON text) rather than a hash, so a collision can't serve stale state
+        if cached is not None and cached[0] == row:
+            self._agent_state_cache.move_to_end(invoice_number)
+            return cached[1]
+        # State fields are stored one per column; invoice_data is a JSON blob
+        state = {key: row[idx] for key, idx in fields}
+        raw = row[data_idx]
+        state["invoice_data"] = (orjson.loads(raw) if orjson is not None else json.loads(raw)) if raw else {}
+        self._agent_state_cache[invoice_number] = (row, state)
+        self._agent_state_cache.move_to_end(invoice_number)
+        while len(self._agent_state_cache) > self._STATE_CACHE_MAX:
+            self._agent_state_cache.popitem(last=False)
+        return state
+
+    def _batch_fetch(self, invoice_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read several agent states with one IN (...) query per chunk; missing invoices are absent from the result."""
+        with self._db_lock:
+            return self._batch_fetch_locked(invoice_numbers)
+
+    def _batch_fetch_locked(self, invoice_numbers: List[str]) -> Dict[str, Dict[str, Any]]:
+        results: Dict[str, Dict[str, Any]] = {}
         try:
-            conn = sqlite3.connect("invoice_states.db")
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT state_json FROM invoice_states WHERE invoice_number = ?",
-                (invoice_number,),
-            )
-            row = cur.fetchone()
-            conn.close()
-            if not row:
-                return None
-            return json.loads(row[0])
+            conn = self._state_db()
+            # Multi-chunk batches read inside one explicit transaction: a single consistent WAL snapshot
+            multi = len(invoice_numbers) > self._FETCH_CHUNK_SIZE
+            if multi:
+                conn.execute("BEGIN")
+            try:
+                for start in range(0, len(invoice_numbers), self._FETCH_CHUNK_SIZE):
+                    chunk = invoice_numbers[start:start + self._FETCH_CHUNK_SIZE]
+                    cur = conn.execute(
+                        f"SELECT * FROM invoice_states WHERE invoice_number IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                    columns = [d[0] for d in cur.description]
+                    fields = [(name, idx) for idx, name in enumerate(columns)
+                              if name not in ("invoice_number", "invoice_data_json", "created_at", "updated_at")]
+                    inv_idx = columns.index("invoice_number")
+                    data_idx = columns.index("invoice_data_json")
+                    for row in cur:
+                        results[row[inv_idx]] = self._state_from_row(row, fields, inv_idx, data_idx)
+            finally:
+                if multi:
+                    conn.execute("COMMIT")
         except Exception as e:
             logger.warning(f"Failed to read invoice state: {e}")
-            return None
+        return results
+
+    def _fetch_state_from_db(self, invoice_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Read the latest agent state from the local SQLite DB (invoice_states.db).
+        Lookups arriving from other threads while a query runs are queued and answered together
+        by whichever caller takes the connection next, with a single IN (...) query.
+        """
+        slot = {"done": False, "state": None}
+        with self._fetch_queue_lock:
+            self._fetch_queue.setdefault(invoice_number, []).append(slot)
+        with self._db_lock:
+            if not slot["done"]:
+                with self._fetch_queue_lock:
+                    batch, self._fetch_queue = self._fetch_queue, {}
+                results = self._batch_fetch_locked(list(batch))
+                for inv, slots in batch.items():
+                    for waiting in slots:
+                        waiting["state"] = results.get(inv)
+                        waiting["done"] = True
+        return slot["state"]
+
+    def _on_state_written(self, invoice_number: str) -> None:
+        """Agent callback (I/O thread): wake any waiter for this invoice."""
+        with self._state_events_lock:
+            events = list(self._state_events.get(invoice_number, ()))
+            async_waiters = list(self._async_state_events.get(invoice_number, ()))
+        for event in events:
+            event.set()
+        for loop, async_event in async_waiters:
+            loop.call_soon_threadsafe(async_event.set)
+
+    def _ensure_agent(self) -> None:
+        """Start the background agent and subscribe to its state writes (once)."""
+        ensure_started()
+        if not self._listener_registered:
+            add_state_listener(self._on_state_written)
+            self._listener_registered = True
+
+    def _wait_for_state(self, invoice_number: str, predicate, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Block until the agent state for invoice_number satisfies predicate, or timeout elapses.
+        Re-reads the row when the agent signals a write for this invoice, or on the adaptive
+        _poll_backoff schedule otherwise; returns the last state read.
+        """
+        event = threading.Event()
+        with self._state_events_lock:
+            self._state_events.setdefault(invoice_number, []).append(event)
+        try:
+            deadline = time.monotonic() + timeout
+            intervals = _poll_backoff()
+            while True:
+                # Clear before reading so a write landing during the read still wakes the next wait
+                event.clear()
+                agent_state = self._fetch_state_from_db(invoice_number)
+                if predicate(agent_state):
+                    return agent_state
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return agent_state
+                event.wait(min(next(intervals), remaining))
+        finally:
+            with self._state_events_lock:
+                events = self._state_events.get(invoice_number, [])
+                if event in events:
+                    events.remove(event)
+                if not events:
+                    self._state_events.pop(invoice_number, None)
+
+    async def _wait_for_state_async(self, invoice_number: str, predicate, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Async counterpart of _wait_for_state: waiters park on an asyncio.Event instead of a thread,
+        so many pending invoices share one event loop. Same notification/backoff re-read policy.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        with self._state_events_lock:
+            self._async_state_events.setdefault(invoice_number, []).append(waiter)
+        try:
+            deadline = loop.time() + timeout
+            intervals = _poll_backoff()
+            while True:
+                event.clear()
+                # Point read on the default executor; coalesced with concurrent lookups by _fetch_state_from_db
+                agent_state = await loop.run_in_executor(None, self._fetch_state_from_db, invoice_number)
+                if predicate(agent_state):
+                    return agent_state
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return agent_state
+                try:
+                    await asyncio.wait_for(event.wait(), min(next(intervals), remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._state_events_lock:
+                waiters = self._async_state_events.get(invoice_number, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._async_state_events.pop(invoice_number, None)
 
     def _update_discord_state(self, state: Dict[str, Any], agent_state: Dict[str, Any]) -> None:
         """Merge fields from agent state into workflow's discord_state."""
@@ -122,6 +330,28 @@ class DiscordNodes:
             "created_at": (agent_state.get("invoice_data", {}) or {}).get("Timestamp"),
         })
 
+    def _apply_submission_failure(self, state: Dict[str, Any], reason: str) -> None:
+        """Auto-approve (if configured) or leave pending when the agent could not post the invoice."""
+        if "discord_state" not in state or not isinstance(state["discord_state"], dict):
+            state["discord_state"] = {}
+        if self.auto_approve_on_failure:
+            state["discord_state"].update({
+                "thread_id": "auto-approved",
+                "message_id": "auto-approved",
+                "approval_status": "approved",
+                "cost_center": "AUTO-APPROVED",
+                "approver": "system",
+                "payment_status": "completed",
+                "transaction_id": "auto-confirmed",
+                "created_at": datetime.now().isoformat()
+            })
+            log_state(state, f"Auto-approved invoice ({reason})", Fore.GREEN)
+        else:
+            state["discord_state"].update({
+                "approval_status": "pending",
+                "payment_status": "pending"
+            })
+
     def create_discord_thread(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Create the Discord approval thread via the agent. If disabled, auto-approve.
@@ -165,56 +395,41 @@ class DiscordNodes:
             return state
 
         try:
-            ensure_started()
+            self._ensure_agent()
             fut = submit_invoice(payload)
-            # Submission dispatched asynchronously; proceed without waiting.
-
-            agent_state = self._fetch_state_from_db(payload["Invoice Number"])
+            invoice_number = payload["Invoice Number"]
+            # Track the submission instead of blocking the workflow on it; check_discord_approval
+            # picks up the posted thread (or a failed submission) on a later pass
+            self._submissions[invoice_number] = fut
+            # A finished (or failed) submission also wakes waiters so failures don't sit out the timeout
+            fut.add_done_callback(lambda _f: self._on_state_written(invoice_number))
+            if self.thread_wait_seconds > 0:
+                agent_state = self._wait_for_state(
+                    invoice_number,
+                    lambda s: bool(s and s.get("discord_thread_id")) or fut.done(),
+                    self.thread_wait_seconds,
+                )
+            else:
+                agent_state = self._fetch_state_from_db(invoice_number)
             if agent_state:
+                self._submissions.pop(invoice_number, None)
                 self._update_discord_state(state, agent_state)
                 log_state(state, "Discord thread created", Fore.GREEN)
+            elif fut.done():
+                self._submissions.pop(invoice_number, None)
+                logger.warning("Agent submission finished without a stored state")
+                self._apply_submission_failure(state, "agent state not found")
             else:
-                logger.warning("Agent state not found in DB yet; keeping status as pending")
                 if "discord_state" not in state or not isinstance(state["discord_state"], dict):
                     state["discord_state"] = {}
-                if self.auto_approve_on_failure:
-                    state["discord_state"].update({
-                        "thread_id": "auto-approved",
-                        "message_id": "auto-approved",
-                        "approval_status": "approved",
-                        "cost_center": "AUTO-APPROVED",
-                        "approver": "system",
-                        "payment_status": "completed",
-                        "transaction_id": "auto-confirmed",
-                        "created_at": datetime.now().isoformat()
-                    })
-                    log_state(state, "Auto-approved invoice (agent state not found)", Fore.GREEN)
-                else:
-                    state["discord_state"].update({
-                        "approval_status": "pending",
-                        "payment_status": "pending"
-                    })
-        except Exception as e:
-            logger.error(f"Failed to create Discord thread via agent: {e}")
-            if "discord_state" not in state or not isinstance(state["discord_state"], dict):
-                state["discord_state"] = {}
-            if self.auto_approve_on_failure:
-                state["discord_state"].update({
-                    "thread_id": "auto-approved",
-                    "message_id": "auto-approved",
-                    "approval_status": "approved",
-                    "cost_center": "AUTO-APPROVED",
-                    "approver": "system",
-                    "payment_status": "completed",
-                    "transaction_id": "auto-confirmed",
-                    "created_at": datetime.now().isoformat()
-                })
-                log_state(state, "Auto-approved invoice (agent failure)", Fore.GREEN)
-            else:
                 state["discord_state"].update({
                     "approval_status": "pending",
                     "payment_status": "pending"
                 })
+                log_state(state, "Discord thread submission in progress", Fore.CYAN)
+        except Exception as e:
+            logger.error(f"Failed to create Discord thread via agent: {e}")
+            self._apply_submission_failure(state, "agent failure")
 
         return state
 
@@ -231,8 +446,15 @@ class DiscordNodes:
 
         agent_state = self._fetch_state_from_db(invoice_number)
         if agent_state:
+            self._submissions.pop(invoice_number, None)
             self._update_discord_state(state, agent_state)
             log_state(state, "Checked Discord approval (non-blocking)", Fore.CYAN)
+        else:
+            fut = self._submissions.get(invoice_number)
+            if fut is not None and fut.done():
+                # The background submission ended without storing a state: apply the failure policy now
+                self._submissions.pop(invoice_number, None)
+                self._apply_submission_failure(state, "agent submission failed")
 
         return state
 
@@ -262,6 +484,77 @@ class DiscordNodes:
 
         return state
 
+    async def check_discord_approval_async(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait (up to wait_seconds) for the approval decision, waking on agent state writes rather than polling."""
+        if not self.enabled:
+            return state
+
+        inv = state.get("invoice_processing_result") or {}
+        data = (inv.get("data") or {})
+        invoice_number = data.get("invoice_number", "")
+        if not invoice_number:
+            return state
+        # Already decided (or auto-approved after a failed submission): nothing to wait for
+        if (state.get("discord_state") or {}).get("approval_status") in ("approved", "rejected"):
+            return state
+
+        self._ensure_agent()
+        fut = self._submissions.get(invoice_number)
+        agent_state = await self._wait_for_state_async(
+            invoice_number,
+            lambda s: (bool(s) and (s.get("approval_status") or "pending") != "pending")
+                      or (not s and fut is not None and fut.done()),
+            self.wait_seconds,
+        )
+        if agent_state:
+            self._submissions.pop(invoice_number, None)
+            self._update_discord_state(state, agent_state)
+            log_state(state, "Checked Discord approval", Fore.CYAN)
+        elif fut is not None and fut.done():
+            # The background submission ended without storing a state: apply the failure policy now
+            self._submissions.pop(invoice_number, None)
+            self._apply_submission_failure(state, "agent submission failed")
+
+        return state
+
+    async def check_payment_confirmation_async(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait (up to payment_wait_seconds) for the payment outcome, waking on agent state writes rather than polling."""
+        if not self.enabled:
+            return self.check_payment_confirmation(state)
+
+        inv = state.get("invoice_processing_result") or {}
+        data = (inv.get("data") or {})
+        invoice_number = data.get("invoice_number", "")
+        if not invoice_number:
+            return state
+        # Already settled (e.g. auto-confirmed after a failed submission): nothing to wait for
+        if (state.get("discord_state") or {}).get("payment_status") not in (None, "pending"):
+            return state
+
+        self._ensure_agent()
+        agent_state = await self._wait_for_state_async(
+            invoice_number,
+            lambda s: bool(s) and (s.get("payment_status") or "pending") != "pending",
+            self.payment_wait_seconds,
+        )
+        if agent_state:
+            self._update_discord_state(state, agent_state)
+            log_state(state, "Checked payment confirmation", Fore.CYAN)
+
+        return state
+
+    def wait_for_discord_approval(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Sync wrapper for callers that choose to wait: run check_discord_approval_async on the agent loop and block on it."""
+        if not self.enabled:
+            return self.check_discord_approval(state)
+        return run_coroutine(self.check_discord_approval_async(state)).result()
+
+    def wait_for_payment_confirmation(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Sync wrapper for callers that choose to wait: run check_payment_confirmation_async on the agent loop and block on it."""
+        if not self.enabled:
+            return self.check_payment_confirmation(state)
+        return run_coroutine(self.check_payment_confirmation_async(state)).result()
+
     @classmethod
     def cleanup(cls):
         """No-op: agent lifecycle is managed by src/discord_integration.py"""
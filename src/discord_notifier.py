@@ -1,10 +1,86 @@
 import os
+import json
+import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from typing import Dict, Optional
 
+try:
+    # Optional: faster request-body encoding
+    import orjson
+except ImportError:
+    orjson = None
+
 DISCORD_API_BASE = "https://discord.com/api/v10"
 
+# Shared keep-alive session: channel/message/thread calls reuse pooled TLS connections to discord.com.
+# Retries apply to idempotent methods only (urllib3's default), so message/thread POSTs are never replayed.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      respect_retry_after_header=True, raise_on_status=False),
+))
+
+def _build_embed_template() -> str:
+    """
+    Serialize the approval-request message body once, leaving str.format_map fields for the per-invoice values.
+    Placeholders are marked with @@name@@ while dumping so JSON's own braces can be escaped first.
+    """
+    embed = {
+        "title": "🧾 Invoice Approval Request",
+        "description": "Vendor: @@vendor@@",
+        "color": 3447003,
+        "fields": [
+            {
+                "name": "📋 Invoice Details",
+                "value": "**Number:** @@inv_no@@\n**Date:** @@inv_date@@\n**Amount:** @@amount@@ @@currency@@",
+                "inline": False
+            },
+            {
+                "name": "🏦 Payment Details",
+                "value": "**Account Holder:** @@account_holder@@\n"
+                         "**Bank:** @@bank_address@@\n"
+                         "**Account:** @@account_number@@",
+                "inline": False
+            },
+            {
+                "name": "📊 Additional Info",
+                "value": "**Line Items:** @@line_items@@\n**Submitted:** @@submitted@@",
+                "inline": False
+            },
+            {
+                "name": "⚡ Action Required",
+                "value": "Please respond with:\n• `APPROVE <cost_center>` to approve\n• `REJECT <reason>` to reject\n\n"
+                         "@@role_mention@@",
+                "inline": False
+            }
+        ]
+    }
+    body = json.dumps({"embeds": [embed]}, ensure_ascii=False).replace("{", "{{").replace("}", "}}")
+    return re.sub(r"@@(\w+)@@", r"{\1}", body)
+
+
+_EMBED_TEMPLATE = _build_embed_template()
+
+
+def _json_text(value) -> str:
+    """str(value) escaped for use inside a JSON string literal."""
+    if orjson is not None:
+        return orjson.dumps(str(value)).decode()[1:-1]
+    return json.dumps(str(value), ensure_ascii=False)[1:-1]
+
+
+def _json_body(obj) -> bytes:
+    """Encode a request body (UTF-8 JSON)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
 class DiscordNotifier:
     def __init__(self,
                  bot_token: Optional[str] = None,
@@ -13,9 +89,17 @@ class DiscordNotifier:
         self.bot_token = bot_token or os.getenv("DISCORD_TOKEN") or os.getenv("DISCORD_BOT_TOKEN")
         self.channel_id = channel_id or os.getenv("DISCORD_CHANNEL_ID")
         self.approving_role_id = approving_role_id or os.getenv("APPROVING_TEAM_ROLE_ID")
+        # Body template with this notifier's role mention (the only per-instance static value) baked in
+        self._embed_template = _EMBED_TEMPLATE.replace(
+            "{role_mention}", _json_text(f"<@&{self.approving_role_id}>").replace("{", "{{").replace("}", "}}")
+        )
+        # Request headers are fixed for the notifier's lifetime
+        self._headers_cache = {"Authorization": f"Bot {self.bot_token}", "Content-Type": "application/json"}
+        # Guild of self.channel_id, resolved once; threads live in their parent channel's guild
+        self._guild_id: Optional[str] = None
 
     def _headers(self) -> Dict[str, str]:
-        return {"Authorization": f"Bot {self.bot_token}", "Content-Type": "application/json"}
+        return self._headers_cache
 
     def is_configured(self) -> bool:
         return bool(self.bot_token and self.channel_id and self.approving_role_id)
@@ -23,7 +107,7 @@ class DiscordNotifier:
     def _get_channel(self, channel_id: str) -> Optional[Dict]:
         try:
             url = f"{DISCORD_API_BASE}/channels/{channel_id}"
-            resp = requests.get(url, headers=self._headers())
+            resp = SESSION.get(url, headers=self._headers_cache)
             resp.raise_for_status()
             return resp.json()
         except Exception:
@@ -35,6 +119,12 @@ class DiscordNotifier:
             return None
         return str(ch.get("guild_id")) if ch.get("guild_id") else None
 
+    def _channel_guild_id(self) -> Optional[str]:
+        """Guild of the configured channel, fetched on first use (failed lookups are retried next time)."""
+        if self._guild_id is None:
+            self._guild_id = self._resolve_guild_id(self.channel_id)
+        return self._guild_id
+
     def post_invoice_and_create_thread(self, invoice: Dict) -> Optional[str]:
         if not self.is_configured():
             return None
@@ -49,42 +139,25 @@ class DiscordNotifier:
             submitted = invoice.get('submitted_at') or invoice.get('timestamp') or ''
             payment = invoice.get('payment_details') or {}
 
-            role_mention = f"<@&{self.approving_role_id}>"
-
-            embed = {
-                "title": "🧾 Invoice Approval Request",
-                "description": f"Vendor: {vendor}",
-                "color": 3447003,
-                "fields": [
-                    {
-                        "name": "📋 Invoice Details",
-                        "value": f"**Number:** {inv_no}\n**Date:** {inv_date}\n**Amount:** {amount} {currency}",
-                        "inline": False
-                    },
-                    {
-                        "name": "🏦 Payment Details",
-                        "value": f"**Account Holder:** {payment.get('account_holder','')}\n"
-                                 f"**Bank:** {payment.get('bank_address','')}\n"
-                                 f"**Account:** {payment.get('account_number','')}",
-                        "inline": False
-                    },
-                    {
-                        "name": "📊 Additional Info",
-                        "value": f"**Line Items:** {len(line_items)}\n**Submitted:** {submitted}",
-                        "inline": False
-                    },
-                    {
-                        "name": "⚡ Action Required",
-                        "value": "Please respond with:\n• `APPROVE <cost_center>` to approve\n• `REJECT <reason>` to reject\n\n"
-                                 f"{role_mention}",
-                        "inline": False
-                    }
-                ]
-            }
+            # Values are JSON-escaped and dropped straight into the pre-serialized request body
+            payload_body = self._embed_template.format_map({
+                key: _json_text(value) for key, value in (
+                    ("vendor", vendor),
+                    ("inv_no", inv_no),
+                    ("inv_date", inv_date),
+                    ("amount", amount),
+                    ("currency", currency),
+                    ("account_holder", payment.get('account_holder', '')),
+                    ("bank_address", payment.get('bank_address', '')),
+                    ("account_number", payment.get('account_number', '')),
+                    ("line_items", len(line_items)),
+                    ("submitted", submitted),
+                )
+            })
 
             # Create the message with embed
             url = f"{DISCORD_API_BASE}/channels/{self.channel_id}/messages"
-            resp = requests.post(url, headers=self._headers(), json={"embeds": [embed]})
+            resp = SESSION.post(url, headers=self._headers_cache, data=payload_body.encode("utf-8"))
             resp.raise_for_status()
             message = resp.json()
             message_id = message["id"]
@@ -92,12 +165,12 @@ class DiscordNotifier:
             # Create a thread from the message
             thread_name = f"Invoice {inv_no} - {vendor}".strip()
             url = f"{DISCORD_API_BASE}/channels/{self.channel_id}/messages/{message_id}/threads"
-            resp = requests.post(url, headers=self._headers(), json={"name": thread_name})
+            resp = SESSION.post(url, headers=self._headers_cache, data=_json_body({"name": thread_name}))
             resp.raise_for_status()
             thread = resp.json()
             thread_id = thread["id"]
 
-            guild_id = self._resolve_guild_id(thread_id) or self._resolve_guild_id(self.channel_id)
+            guild_id = self._channel_guild_id()
             if not guild_id:
                 return None
 
@@ -1,30 +1,77 @@
 import os
+import threading
 import time
+from collections import OrderedDict
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Optional, Tuple
 
 # Etherscan Sepolia API key is expected in environment
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
 
+_WEI_PER_ETH = 10**18
+
+# Shared keep-alive session so retries and repeat lookups reuse one pooled TLS connection.
+# Transient network errors, 429s and 5xx are retried with jittered exponential backoff,
+# waiting exactly as long as Etherscan's Retry-After asks when it sends one.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods={"GET"}, respect_retry_after_header=True, backoff_jitter=0.1,
+                      raise_on_status=False),
+))
+
+# Result caches. A successful receipt and a nonzero transfer value are final on-chain, so they are
+# kept for the process lifetime; anything else (pending, failed, zero) may still change and is only
+# reused for _TX_RETRY_TTL seconds. Lookups that raised are never cached.
+_TX_RETRY_TTL = 30.0
+_TX_CACHE_MAX = 10_000
+_tx_cache_lock = threading.Lock()
+_tx_final: Dict[Tuple[str, str], Any] = {}
+_tx_recent: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+
+
+def _tx_cache_get(kind: str, tx_hash: str) -> Optional[Any]:
+    key = (kind, tx_hash.lower())
+    with _tx_cache_lock:
+        if key in _tx_final:
+            return _tx_final[key]
+        entry = _tx_recent.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _tx_recent[key]
+            return None
+        return entry[1]
+
+
+def _tx_cache_put(kind: str, tx_hash: str, value: Any, final: bool) -> None:
+    key = (kind, tx_hash.lower())
+    with _tx_cache_lock:
+        if final:
+            _tx_recent.pop(key, None)
+            if len(_tx_final) < _TX_CACHE_MAX:
+                _tx_final[key] = value
+            return
+        _tx_recent[key] = (time.monotonic() + _TX_RETRY_TTL, value)
+        _tx_recent.move_to_end(key)
+        while len(_tx_recent) > _TX_CACHE_MAX:
+            _tx_recent.popitem(last=False)
+
 
 def _etherscan_get(params: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Internal helper to call Etherscan Sepolia API with simple retry/backoff.
+    Internal helper to call Etherscan Sepolia API; retry/backoff is handled by SESSION's Retry policy.
     Preserves existing logic and response handling.
     """
     url = "https://api-sepolia.etherscan.io/api"
     params = {**params, "apikey": ETHERSCAN_API_KEY}
-    last_err = None
-    for attempt in range(3):
-        try:
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            return resp.json()
-        except Exception as e:
-            last_err = e
-            # brief backoff to handle transient network/rate-limit
-            time.sleep(0.5 * (attempt + 1))
-    raise last_err if last_err else RuntimeError("Etherscan request failed")
+    resp = SESSION.get(url, params=params, timeout=10)
+    resp.raise_for_status()
+    return resp.json()
 
 
 def check_transaction_success(tx_hash: str) -> bool:
@@ -32,22 +79,30 @@ def check_transaction_success(tx_hash: str) -> bool:
     Return True if the transaction succeeded on Sepolia (status == '1'), else False.
     Logic preserved from original implementation.
     """
+    cached = _tx_cache_get("status", tx_hash)
+    if cached is not None:
+        return cached
     try:
         data = _etherscan_get({
             "module": "transaction",
             "action": "gettxreceiptstatus",
             "txhash": tx_hash
         })
-        return (data or {}).get("result", {}).get("status") == "1"
+        success = (data or {}).get("result", {}).get("status") == "1"
     except Exception:
         return False
+    _tx_cache_put("status", tx_hash, success, final=success)
+    return success
 
 
-def get_transaction_amount_eth(tx_hash: str) -> float:
+def get_transaction_amount_wei(tx_hash: str) -> int:
     """
-    Return the transaction value in ETH using proxy.eth_getTransactionByHash (wei -> ETH).
-    Logic preserved from original implementation.
+    Return the exact transaction value in wei using proxy.eth_getTransactionByHash.
+    Use this for amount comparisons; the ETH float loses precision above 2**53 wei.
     """
+    cached = _tx_cache_get("amount", tx_hash)
+    if cached is not None:
+        return cached
     try:
         data = _etherscan_get({
             "module": "proxy",
@@ -55,6 +110,16 @@ def get_transaction_amount_eth(tx_hash: str) -> float:
             "txhash": tx_hash
         })
         value_hex = (data or {}).get("result", {}).get("value", "0x0")
-        return int(value_hex, 16) / 10**18
+        wei = int(value_hex, 16)
     except Exception:
-        return 0.0
+        return 0
+    _tx_cache_put("amount", tx_hash, wei, final=wei > 0)
+    return wei
+
+
+def get_transaction_amount_eth(tx_hash: str) -> float:
+    """
+    Return the transaction value in ETH using proxy.eth_getTransactionByHash (wei -> ETH).
+    Logic preserved from original implementation.
+    """
+    return get_transaction_amount_wei(tx_hash) / _WEI_PER_ETH
@@ -1,12 +1,20 @@
+import multiprocessing
 import os
+import random
+import re
 import tempfile
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 # Google Drive API
 from google.auth.transport.requests import Request, AuthorizedSession
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
@@ -21,6 +29,83 @@ from .state import Email
 # Google Drive API scopes
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
+# Invoice-like filenames / supported types for _is_invoice_file
+_INVOICE_NAME_KEYWORDS = ('invoice', 'bill', 'receipt', 'statement', 'payment')
+_INVOICE_NAME_RE = re.compile('|'.join(_INVOICE_NAME_KEYWORDS), re.IGNORECASE)
+_SUPPORTED_MIME_TYPES = frozenset({
+    'application/pdf',
+    'image/jpeg',
+    'image/png',
+    'image/gif',
+    'image/bmp',
+    'text/plain'
+})
+# Content-Range of a 206 slice: "bytes <start>-<end>/<total>"
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+def _retry_delay(attempt: int, error: Exception = None) -> float:
+    """
+    Seconds to wait before retry `attempt`: the server's Retry-After on a 429/503 when it sent one,
+    otherwise full-jitter exponential backoff so parallel workers don't retry in lockstep.
+    """
+    # googleapiclient HttpError exposes .resp (httplib2, lowercase keys); requests HTTPError exposes .response
+    resp = getattr(error, 'resp', None)
+    if resp is not None:
+        status, retry_after = getattr(resp, 'status', None), resp.get('retry-after')
+    else:
+        resp = getattr(error, 'response', None)
+        status = getattr(resp, 'status_code', None)
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+    if str(status) in ('429', '503') and retry_after:
+        try:
+            return min(float(retry_after), 60.0)
+        except ValueError:
+            pass  # HTTP-date form: fall back to jittered backoff
+    return random.uniform(0, min(2 ** attempt, 30))
+
+# Parse pool for process_multiple_invoices: PDF text extraction / page rendering is CPU-bound and
+# would serialize the file worker threads on the GIL. Created lazily; GDRIVE_PARSE_PROCESSES=0 disables it
+_PARSE_POOL: Optional[ProcessPoolExecutor] = None
+_PARSE_POOL_LOCK = threading.Lock()
+# One InvoiceRAGAgent per worker process, keyed on its constructor args
+_WORKER_AGENTS: Dict[tuple, InvoiceRAGAgent] = {}
+
+def _parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared parse pool, creating it on first use (None when disabled)."""
+    global _PARSE_POOL
+    try:
+        workers = int(os.getenv('GDRIVE_PARSE_PROCESSES', str(min(os.cpu_count() or 1, 4))))
+    except ValueError:
+        workers = 0
+    if workers <= 0:
+        return None
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None:
+            # spawn, not fork: the parent holds live threads, sockets and SQLite connections
+            _PARSE_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _PARSE_POOL
+
+def _discard_parse_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken parse pool so the next call starts a fresh one."""
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is pool:
+            _PARSE_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _process_invoice_worker(temp_path: str, openai_api_key: str, google_creds_path: str, sheet_name: str) -> Dict:
+    """Parse-pool entry point: run the RAG pipeline on a downloaded file (strings in, result dict out)."""
+    key = (openai_api_key, google_creds_path, sheet_name)
+    agent = _WORKER_AGENTS.get(key)
+    if agent is None:
+        agent = _WORKER_AGENTS[key] = InvoiceRAGAgent(
+            openai_api_key=openai_api_key,
+            google_creds_path=google_creds_path,
+            sheet_name=sheet_name
+        )
+    return agent.process_invoice(temp_path)
+
 class GDriveInvoiceProcessor:
     def __init__(self, openai_api_key: str, google_creds_path: str = "gdrive.json", 
                  token_file: str = "token1.json", sheet_name: str = "Invoice"):
@@ -35,12 +120,30 @@ class GDriveInvoiceProcessor:
         """
         # Load environment variables
         load_dotenv()
+        self.configure()
         
         self.openai_api_key = openai_api_key
         self.credentials_file = google_creds_path
         self.token_file = token_file
         self.service = None
+        # googleapiclient services (httplib2) are not thread-safe: worker threads get their own
+        self._local = threading.local()
         self._authenticate()
+        # One keep-alive session for the direct-download fallback, pooled for the parallel file workers.
+        # urllib3 retries 429/5xx responses itself (jittered, honoring Retry-After); the loop in
+        # _download_via_authorized_session only handles errors mid-stream and the final status
+        self._session = AuthorizedSession(self.creds)
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
         
         # Initialize the Invoice RAG Agent
         # Use g_sheets.json for Google Sheets authentication (service account)
@@ -50,9 +153,50 @@ class GDriveInvoiceProcessor:
             google_creds_path=sheets_creds_path,
             sheet_name=sheet_name
         )
+        # Picklable constructor args for the parse-pool workers' own agents
+        self._agent_args = (openai_api_key, sheets_creds_path, sheet_name)
         # Initialize database and Gmail tool for follow-up handling
         self.email_db = EmailDatabase()
         self.gmail_tools = GmailTool()
+        # Serializes validation follow-ups (Gmail sends + follow-up rows) across parallel file workers
+        self._followup_lock = threading.Lock()
+    
+    def configure(self) -> None:
+        """
+        Read the download/listing tunables from the environment once (called after load_dotenv);
+        call again to pick up changed settings instead of re-reading os.environ per file.
+        """
+        # Each MediaIoBaseDownload chunk is a separate request: large chunks mean few round trips
+        try:
+            self._chunk_bytes = max(64 * 1024, int(os.getenv('GDRIVE_DOWNLOAD_CHUNK_KB', '8192')) * 1024)
+        except Exception:
+            self._chunk_bytes = 8192 * 1024
+        try:
+            self._fallback_chunk_bytes = max(64 * 1024, int(os.getenv('GDRIVE_DOWNLOAD_CHUNK_KB', '128')) * 1024)
+        except Exception:
+            self._fallback_chunk_bytes = 128 * 1024
+        try:
+            self._max_attempts = int(os.getenv('GDRIVE_DOWNLOAD_MAX_ATTEMPTS', '5'))
+        except Exception:
+            self._max_attempts = 5
+        try:
+            self._max_invoice_mb = float(os.getenv('MAX_INVOICE_SIZE_MB', '12'))  # default 12 MB
+        except Exception:
+            self._max_invoice_mb = 12.0
+        self._max_invoice_bytes = int(self._max_invoice_mb * 1024 * 1024)
+        try:
+            self._range_min_bytes = int(float(os.getenv('GDRIVE_RANGE_MIN_MB', '4')) * 1024 * 1024)
+        except Exception:
+            self._range_min_bytes = 4 * 1024 * 1024
+        try:
+            self._range_parts = int(os.getenv('GDRIVE_RANGE_PARTS', '4'))
+        except Exception:
+            self._range_parts = 4
+        self._ram_staging = os.getenv('GDRIVE_RAM_STAGING', 'true').lower() in ('1', 'true', 'yes', 'on')
+        try:
+            self._max_workers = int(os.getenv('GDRIVE_MAX_WORKERS', '4'))
+        except Exception:
+            self._max_workers = 4
     
     def _authenticate(self):
         """Authenticate with Google Drive API"""
@@ -82,6 +226,16 @@ class GDriveInvoiceProcessor:
         self.service = build('drive', 'v3', credentials=creds)
         print("✓ Google Drive authentication successful")
     
+    def _drive(self):
+        """Drive service for the calling thread (the shared one on the main thread)."""
+        if threading.current_thread() is threading.main_thread():
+            return self.service
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self.creds, cache_discovery=False)
+            self._local.service = service
+        return service
+    
     def get_latest_invoice_files(self, folder_id: str = None, max_files: int = 5) -> List[Dict]:
         """
         Get the latest invoice files from Google Drive
@@ -99,19 +253,8 @@ class GDriveInvoiceProcessor:
                 raise ValueError("No folder ID provided and GDRIVE_FOLDER_ID not found in .env file")
         
         try:
-            # Query for files in the specified folder
-            query = f"'{folder_id}' in parents and trashed=false"
-            
-            # Get files sorted by creation time (newest first)
-            results = self.service.files().list(
-                q=query,
-                spaces='drive',
-                fields='files(id,name,mimeType,createdTime,size)',
-                orderBy='createdTime desc',
-                pageSize=max_files
-            ).execute()
-            
-            files = results.get('files', [])
+            # Newest files first, from the local metadata cache when the folder has been listed before
+            files = self._list_folder_files(folder_id, max_files)
             
             # Filter for invoice-related files
             invoice_files = []
@@ -120,11 +263,8 @@ class GDriveInvoiceProcessor:
                     invoice_files.append(file)
             
             # Optional: filter by max size to reduce download failures on large files
-            try:
-                max_mb = float(os.getenv('MAX_INVOICE_SIZE_MB', '12'))  # default 12 MB
-            except Exception:
-                max_mb = 12.0
-            max_bytes = int(max_mb * 1024 * 1024)
+            max_mb = self._max_invoice_mb
+            max_bytes = self._max_invoice_bytes
             filtered_files = []
             skipped_large = 0
             for file in invoice_files:
@@ -148,27 +288,124 @@ class GDriveInvoiceProcessor:
             print(f"❌ Error retrieving files from Google Drive: {e}")
             return []
     
+    # Fields cached per Drive file (see EmailDatabase.upsert_drive_files)
+    _DRIVE_FILE_FIELDS = 'id,name,mimeType,createdTime,size,modifiedTime,version,md5Checksum'
+    
+    def _list_folder_files(self, folder_id: str, max_files: int) -> List[Dict]:
+        """
+        Newest files in a folder (newest first). After the first full listing the folder is kept
+        current from the Drive changes feed, so repeat calls cost one changes().list instead of a
+        files().list; an expired token or an incomplete cache falls back to a full listing.
+        """
+        sync = self.email_db.get_drive_sync(folder_id)
+        if sync:
+            try:
+                self._apply_drive_changes(folder_id, sync['page_token'])
+                cached = self.email_db.get_drive_folder_files(folder_id, max_files)
+                if sync['complete'] or len(cached) >= max_files:
+                    return cached
+            except Exception as e:
+                print(f"⚠️ Drive changes sync failed ({e}); re-listing folder")
+        
+        # Take the start token before listing so changes made during the listing replay on the next sync
+        start_token = self.service.changes().getStartPageToken().execute().get('startPageToken')
+        files: List[Dict] = []
+        page_token = None
+        truncated = False
+        while True:
+            # No name filter in the query: Drive's `name contains` matches word prefixes only and would
+            # drop names like "ACME_invoice.pdf"; _is_invoice_file does the substring match locally
+            results = self.service.files().list(
+                q=f"'{folder_id}' in parents and trashed=false",
+                spaces='drive',
+                fields=f'nextPageToken,files({self._DRIVE_FILE_FIELDS})',
+                orderBy='createdTime desc',
+                pageSize=min(max(max_files, 100), 1000),  # 1000 is the API maximum
+                pageToken=page_token
+            ).execute()
+            files.extend(f for f in results.get('files', []) if self._is_invoice_file(f))
+            page_token = results.get('nextPageToken')
+            if len(files) >= max_files:
+                truncated = len(files) > max_files
+                files = files[:max_files]
+                break
+            if not page_token:
+                break
+        
+        self.email_db.clear_drive_folder(folder_id)
+        self.email_db.upsert_drive_files(files, folder_id)
+        if start_token:
+            # complete: the listing covered every invoice-like file, so the cache never needs a re-list to fill up
+            self.email_db.set_drive_sync(folder_id, start_token, complete=not page_token and not truncated)
+        return files
+    
+    def _apply_drive_changes(self, folder_id: str, page_token: str) -> None:
+        """Replay the Drive changes feed since page_token into the folder's cached listing."""
+        new_token = None
+        while page_token:
+            response = self.service.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                pageSize=1000,
+                fields=f'nextPageToken,newStartPageToken,changes(fileId,removed,file({self._DRIVE_FILE_FIELDS},parents,trashed))'
+            ).execute()
+            # The cached listing mirrors the invoice-filtered query: other files count as moved out
+            gone, moved_out, current = [], [], []
+            for change in response.get('changes', []):
+                file = change.get('file') or {}
+                if change.get('removed') or file.get('trashed'):
+                    gone.append(change.get('fileId'))
+                elif folder_id in (file.get('parents') or []) and self._is_invoice_file(file):
+                    current.append(file)
+                else:
+                    moved_out.append(change.get('fileId'))
+            self.email_db.delete_drive_files(gone)
+            self.email_db.delete_drive_files(moved_out, folder_id)
+            self.email_db.upsert_drive_files(current, folder_id)
+            new_token = response.get('newStartPageToken') or new_token
+            page_token = response.get('nextPageToken')
+        if new_token:
+            self.email_db.set_drive_sync(folder_id, new_token)
+    
+    # files().get calls per Drive batch request (Drive allows 100; large batches are prone to 500s)
+    _METADATA_BATCH_SIZE = 25
+    
+    def _prefetch_metadata(self, file_ids: List[str]) -> None:
+        """
+        Cache metadata for the ids not cached yet, packing the files().get calls into Drive batch
+        requests so download_file needs no per-file lookup. Failed entries are simply left uncached.
+        """
+        missing = [fid for fid in dict.fromkeys(file_ids) if self.email_db.get_drive_file(fid) is None]
+        if not missing:
+            return
+        fetched = []
+        
+        def on_response(request_id, response, exception):
+            if exception is None:
+                fetched.append(response)
+        
+        for start in range(0, len(missing), self._METADATA_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for fid in missing[start:start + self._METADATA_BATCH_SIZE]:
+                batch.add(self.service.files().get(fileId=fid, fields=self._DRIVE_FILE_FIELDS))
+            try:
+                batch.execute()
+            except Exception as e:
+                print(f"⚠️ Drive metadata batch failed ({e}); files will be looked up individually")
+        self.email_db.upsert_drive_files(fetched)
+    
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        """True for a Drive 404 from either googleapiclient (HttpError.resp) or requests (response)."""
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+        if status is None:
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+        return str(status) == '404'
+    
     def _is_invoice_file(self, file: Dict) -> bool:
         """Check if a file is likely an invoice based on name and type"""
-        name = file.get('name', '').lower()
-        mime_type = file.get('mimeType', '')
-        
-        # Check for invoice-related keywords in filename
-        invoice_keywords = ['invoice', 'bill', 'receipt', 'statement', 'payment']
-        if any(keyword in name for keyword in invoice_keywords):
-            return True
-        
-        # Check for supported file types
-        supported_types = [
-            'application/pdf',
-            'image/jpeg',
-            'image/png',
-            'image/gif',
-            'image/bmp',
-            'text/plain'
-        ]
-        
-        return mime_type in supported_types
+        # Invoice-related keyword in the filename, or a supported file type
+        return bool(_INVOICE_NAME_RE.search(file.get('name') or '')) or file.get('mimeType') in _SUPPORTED_MIME_TYPES
     
     def download_file(self, file_id: str, filename: str = None) -> Optional[str]:
         """
@@ -182,27 +419,46 @@ class GDriveInvoiceProcessor:
             Path to the downloaded file, or None if download failed
         """
         try:
-            # Get file metadata
-            file_metadata = self.service.files().get(
-                fileId=file_id,
-                fields='name,mimeType'
-            ).execute()
+            # Get file metadata (cached after the first lookup or folder listing)
+            file_metadata = self.email_db.get_drive_file(file_id)
+            if file_metadata is None:
+                file_metadata = self._drive().files().get(
+                    fileId=file_id,
+                    fields=self._DRIVE_FILE_FIELDS
+                ).execute()
+                self.email_db.upsert_drive_files([file_metadata])
             
             if not filename:
                 filename = file_metadata.get('name', f'file_{file_id}')
             
-            # Create temporary file
-            temp_dir = tempfile.gettempdir()
+            # Create temporary file (RAM-backed when the file is small enough)
+            temp_dir = self._staging_dir(file_metadata.get('size'))
             temp_path = os.path.join(temp_dir, filename)
             
-            # Download the file with robust retries and smaller chunks
-            request = self.service.files().get_media(fileId=file_id)
+            # Large files: sliced download (concurrent Range GETs on the pooled session), falling
+            # back to MediaIoBaseDownload if the server won't serve ranges or a slice fails
+            try:
+                size_bytes = int(file_metadata.get('size') or 0)
+            except (TypeError, ValueError):
+                size_bytes = 0
+            if size_bytes >= self._range_min_bytes and self._range_parts > 1 and hasattr(os, 'pwrite'):
+                try:
+                    url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+                    self._download_ranges(url, temp_path, size_bytes, self._range_parts, self._fallback_chunk_bytes)
+                    print(f"✅ Downloaded: {filename} to {temp_path} ({self._range_parts} slices)")
+                    return temp_path
+                except Exception as e:
+                    print(f"⚠️ Sliced download failed ({e}); using chunked download")
             
-            chunk_kb = int(os.getenv('GDRIVE_DOWNLOAD_CHUNK_KB', '256'))  # default 256KB
-            chunk_size = max(64 * 1024, chunk_kb * 1024)
-            max_attempts = int(os.getenv('GDRIVE_DOWNLOAD_MAX_ATTEMPTS', '5'))
+            # Download the file with robust retries
+            request = self._drive().files().get_media(fileId=file_id)
             
-            with open(temp_path, 'wb') as f:
+            chunk_size = self._chunk_bytes
+            max_attempts = self._max_attempts
+            
+            # Owner-only temp file (invoices are private documents)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
                 downloader = MediaIoBaseDownload(f, request, chunksize=chunk_size)
                 done = False
                 attempt = 0
@@ -215,8 +471,8 @@ class GDriveInvoiceProcessor:
                         attempt += 1
                         if attempt >= max_attempts:
                             raise
-                        backoff = min(2 ** attempt, 10)
-                        print(f"⚠️ Download chunk error: {e}. Retrying in {backoff}s (attempt {attempt}/{max_attempts})")
+                        backoff = _retry_delay(attempt, e)
+                        print(f"⚠️ Download chunk error: {e}. Retrying in {backoff:.1f}s (attempt {attempt}/{max_attempts})")
                         time.sleep(backoff)
             
             print(f"✅ Downloaded: {filename} to {temp_path}")
@@ -224,28 +480,67 @@ class GDriveInvoiceProcessor:
             
         except Exception as e:
             print(f"❌ Error downloading file {file_id}: {e}")
+            if self._is_not_found(e):
+                # Gone from Drive: drop the stale cache entry; the fallback would 404 as well
+                self.email_db.delete_drive_files([file_id])
+                return None
             # Fallback: try AuthorizedSession direct download with safe destination
             try:
                 safe_name = filename if 'filename' in locals() and filename else f'file_{file_id}'
-                safe_dest = os.path.join(tempfile.gettempdir(), safe_name)
+                safe_dir = temp_dir if 'temp_dir' in locals() else tempfile.gettempdir()
+                safe_dest = os.path.join(safe_dir, safe_name)
                 fallback_path = self._download_via_authorized_session(file_id, safe_dest)
                 if fallback_path:
                     print(f"✅ Downloaded via AuthorizedSession: {safe_name} to {fallback_path}")
                     return fallback_path
             except Exception as e2:
                 print(f"❌ Fallback AuthorizedSession download failed: {e2}")
+                if self._is_not_found(e2):
+                    self.email_db.delete_drive_files([file_id])
             return None
     
+    def _staging_dir(self, size) -> str:
+        """
+        Directory for a downloaded invoice: /dev/shm (tmpfs) for files of known size up to
+        MAX_INVOICE_SIZE_MB, so the write and the parser's read never touch disk; otherwise the
+        regular temp dir. GDRIVE_RAM_STAGING=false always uses the temp dir.
+        """
+        if not self._ram_staging:
+            return tempfile.gettempdir()
+        try:
+            size_bytes = int(size or 0)
+        except (TypeError, ValueError):
+            return tempfile.gettempdir()
+        if 0 < size_bytes <= self._max_invoice_bytes and os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+            return '/dev/shm'
+        return tempfile.gettempdir()
+    
     def _download_via_authorized_session(self, file_id: str, dest_path: str) -> Optional[str]:
         """
         Fallback downloader using AuthorizedSession to avoid SSL issues with MediaIoBaseDownload.
         """
         if not getattr(self, "creds", None):
             return None
-        session = AuthorizedSession(self.creds)
+        # AuthorizedSession refreshes the token in place, so the shared session never needs rebuilding
+        session = self._session
         url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
-        max_attempts = int(os.getenv('GDRIVE_DOWNLOAD_MAX_ATTEMPTS', '5'))
-        chunk_size = max(64 * 1024, int(os.getenv('GDRIVE_DOWNLOAD_CHUNK_KB', '128')) * 1024)
+        max_attempts = self._max_attempts
+        chunk_size = self._fallback_chunk_bytes
+        
+        # Large files: fetch byte ranges in parallel; any problem drops back to the single stream below
+        try:
+            min_bytes = self._range_min_bytes
+            parts = self._range_parts
+            if parts > 1 and hasattr(os, 'pwrite'):
+                meta = session.get(f"https://www.googleapis.com/drive/v3/files/{file_id}",
+                                   params={'fields': 'size'}, timeout=30)
+                meta.raise_for_status()
+                total_size = int(meta.json().get('size') or 0)
+                if total_size >= min_bytes:
+                    return self._download_ranges(url, dest_path, total_size, parts, chunk_size)
+        except Exception as e:
+            print(f"⚠️ Ranged download unavailable ({e}); using a single stream")
+        
         attempt = 0
         while attempt < max_attempts:
             attempt += 1
@@ -260,12 +555,82 @@ class GDriveInvoiceProcessor:
             except Exception as e:
                 if attempt >= max_attempts:
                     raise
-                backoff = min(2 ** attempt, 10)
-                print(f"⚠️ AuthorizedSession download error: {e}. Retrying in {backoff}s (attempt {attempt}/{max_attempts})")
+                backoff = _retry_delay(attempt, e)
+                print(f"⚠️ AuthorizedSession download error: {e}. Retrying in {backoff:.1f}s (attempt {attempt}/{max_attempts})")
                 time.sleep(backoff)
 
         return None
 
+    def _download_ranges(self, url: str, dest_path: str, total_size: int, parts: int, chunk_size: int) -> str:
+        """
+        Download total_size bytes as `parts` concurrent Range GETs on the shared session,
+        writing each range at its offset (os.pwrite) into a pre-sized file.
+        """
+        span = -(-total_size // parts)
+        ranges = [(start, min(start + span, total_size) - 1) for start in range(0, total_size, span)]
+        fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.ftruncate(fd, total_size)
+        
+        def fetch(byte_range):
+            start, end = byte_range
+            with self._session.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True, timeout=30) as resp:
+                resp.raise_for_status()
+                if resp.status_code != 206:
+                    raise RuntimeError(f"server ignored Range (HTTP {resp.status_code})")
+                # total_size comes from the cached listing; a file that changed since would
+                # otherwise fill every slice and come back silently truncated
+                content_range = _CONTENT_RANGE_RE.match(resp.headers.get('Content-Range', ''))
+                if not content_range or content_range.group(3) != str(total_size):
+                    raise RuntimeError(f"size changed: Content-Range {resp.headers.get('Content-Range')!r}, expected total {total_size}")
+                offset = start
+                for chunk in resp.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+            if offset != end + 1:
+                raise RuntimeError(f"short range {start}-{end}: got {offset - start} bytes")
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="gdrive-range") as pool:
+                list(pool.map(fetch, ranges))
+        finally:
+            os.close(fd)
+        return dest_path
+
+    def _process_downloaded(self, temp_path: str, use_pool: bool = False) -> Dict:
+        """
+        Run the RAG agent on a downloaded file, then drop its pages from the page cache.
+        use_pool runs it in the parse process pool; a broken pool falls back to this process.
+        """
+        try:
+            pool = _parse_pool() if use_pool else None
+            if pool is not None:
+                try:
+                    return pool.submit(_process_invoice_worker, temp_path, *self._agent_args).result()
+                except BrokenProcessPool as e:
+                    print(f"⚠️ Parse worker pool failed ({e}); processing in-process")
+                    _discard_parse_pool(pool)
+            return self.rag_agent.process_invoice(temp_path)
+        finally:
+            self._release_page_cache(temp_path)
+    
+    @staticmethod
+    def _release_page_cache(path: str) -> None:
+        """
+        Invoice files are read exactly once by the parser; advise the kernel to drop their cached
+        pages instead of letting a large batch crowd out useful cache (no-op where fadvise is missing).
+        """
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    
     def process_latest_invoice(self, folder_id: str = None) -> Dict:
         """
         Process the latest invoice file from Google Drive
@@ -301,7 +666,7 @@ class GDriveInvoiceProcessor:
         
         try:
             # Process the invoice using RAG agent
-            result = self.rag_agent.process_invoice(temp_path)
+            result = self._process_downloaded(temp_path)
             
             # Add file metadata to result
             result['source_file'] = {
@@ -346,7 +711,7 @@ class GDriveInvoiceProcessor:
             }
         try:
             # Process the invoice using RAG agent
-            result = self.rag_agent.process_invoice(temp_path)
+            result = self._process_downloaded(temp_path)
             # Add file metadata to result
             result['source_file'] = {
                 'gdrive_id': file_id,
@@ -402,58 +767,97 @@ class GDriveInvoiceProcessor:
                 "error": "No invoice files found in the specified Google Drive folder"
             }]
         
-        results = []
+        # Capped at 5 to stay inside Drive's per-user rate limits
+        max_workers = max(1, min(self._max_workers, 5, len(files)))
+        
+        # One batched metadata round trip up front instead of a files().get per worker
+        self._prefetch_metadata([file['id'] for file in files])
+        
+        # Files are independent (Drive download + RAG call): process them concurrently, keeping input order
+        results: List[Optional[Dict]] = [None] * len(files)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gdrive") as pool:
+            futures = {
+                pool.submit(self._process_listed_file, i, len(files), file): i - 1
+                for i, file in enumerate(files, 1)
+            }
+            for fut in as_completed(futures):
+                idx = futures[fut]
+                try:
+                    results[idx] = fut.result()
+                except Exception as e:
+                    file = files[idx]
+                    results[idx] = {
+                        "status": "processing_failed",
+                        "error": f"Failed to process invoice: {str(e)}",
+                        'source_file': {
+                            'gdrive_id': file['id'],
+                            'filename': file['name']
+                        }
+                    }
+        
+        return results
+    
+    def _process_listed_file(self, i: int, total: int, file: Dict) -> Dict:
+        """Download and process one file from a Drive listing; errors are returned as result dicts."""
+        print(f"\n📄 Processing file {i}/{total}: {file['name']}")
+        
+        # Same content already through the pipeline: reuse its result, skipping download, OCR and sheet write
+        md5 = file.get('md5Checksum')
+        if md5:
+            cached = self.email_db.get_processed_result(file['id'], md5)
+            if cached is not None:
+                print(f"♻️ Unchanged since last run, reusing result: {file['name']}")
+                cached['cached'] = True
+                return cached
+        
+        # Download the file
+        temp_path = self.download_file(file['id'], file['name'])
+        
+        if not temp_path:
+            return {
+                "status": "download_failed",
+                "error": f"Failed to download file: {file['name']}",
+                'source_file': {
+                    'gdrive_id': file['id'],
+                    'filename': file['name']
+                }
+            }
         
-        for i, file in enumerate(files, 1):
-            print(f"\n📄 Processing file {i}/{len(files)}: {file['name']}")
+        try:
+            # Process the invoice using RAG agent
+            result = self._process_downloaded(temp_path, use_pool=True)
             
-            # Download the file
-            temp_path = self.download_file(file['id'], file['name'])
+            # Add file metadata to result
+            result['source_file'] = {
+                'gdrive_id': file['id'],
+                'filename': file['name'],
+                'created_time': file.get('createdTime'),
+                'temp_path': temp_path
+            }
+
+            # Handle validation failures: send consolidated email and schedule reminder
+            if result.get("status") == "validation_failed":
+                try:
+                    self._handle_validation_failure_followup(result)
+                except Exception as e:
+                    print(f"⚠️ Failed to handle validation failure follow-up: {e}")
+            elif result.get("status") == "completed" and md5:
+                # The temp file is cleaned up after this run, so it is not part of the stored result
+                stored = dict(result, source_file={k: v for k, v in result['source_file'].items() if k != 'temp_path'})
+                self.email_db.store_processed_result(file['id'], md5, stored)
             
-            if not temp_path:
-                results.append({
-                    "status": "download_failed",
-                    "error": f"Failed to download file: {file['name']}",
-                    'source_file': {
-                        'gdrive_id': file['id'],
-                        'filename': file['name']
-                    }
-                })
-                continue
+            return result
             
-            try:
-                # Process the invoice using RAG agent
-                result = self.rag_agent.process_invoice(temp_path)
-                
-                # Add file metadata to result
-                result['source_file'] = {
+        except Exception as e:
+            return {
+                "status": "processing_failed",
+                "error": f"Failed to process invoice: {str(e)}",
+                'source_file': {
                     'gdrive_id': file['id'],
                     'filename': file['name'],
-                    'created_time': file.get('createdTime'),
                     'temp_path': temp_path
                 }
-
-                # Handle validation failures: send consolidated email and schedule reminder
-                if result.get("status") == "validation_failed":
-                    try:
-                        self._handle_validation_failure_followup(result)
-                    except Exception as e:
-                        print(f"⚠️ Failed to handle validation failure follow-up: {e}")
-                
-                results.append(result)
-                
-            except Exception as e:
-                results.append({
-                    "status": "processing_failed",
-                    "error": f"Failed to process invoice: {str(e)}",
-                    'source_file': {
-                        'gdrive_id': file['id'],
-                        'filename': file['name'],
-                        'temp_path': temp_path
-                    }
-                })
-        
-        return results
+            }
     
     def cleanup_temp_files(self, results: List[Dict]):
         """Clean up temporary files after processing"""
@@ -469,13 +873,15 @@ class GDriveInvoiceProcessor:
 
     def _add_business_days(self, start_dt: datetime, days: int) -> datetime:
         """Add business days (Mon–Fri) to a datetime."""
-        remaining = days
-        current = start_dt
-        while remaining > 0:
-            current += timedelta(days=1)
-            if current.weekday() < 5:
-                remaining -= 1
-        return current
+        if days <= 0:
+            return start_dt
+        # Counting from a weekend is the same as counting from the Friday before it
+        weekday = start_dt.weekday()
+        anchor = start_dt - timedelta(days=weekday - 4) if weekday >= 5 else start_dt
+        # Every 5 business days is a calendar week; the remainder crosses at most one weekend
+        weeks, rem = divmod(days, 5)
+        extra = rem + 2 if anchor.weekday() + rem >= 5 else rem
+        return anchor + timedelta(days=weeks * 7 + extra)
 
     def _compose_missing_info_email(self, missing_fields: List[str], original_subject: str, is_reminder: bool = False) -> str:
         """Create a consolidated email listing required information."""
@@ -502,6 +908,11 @@ class GDriveInvoiceProcessor:
 
     def _handle_validation_failure_followup(self, result: Dict) -> None:
         """Send consolidated missing-info email and persist one-time reminder schedule."""
+        # One follow-up at a time: keeps the open-followup idempotency check and the Gmail client single-threaded
+        with self._followup_lock:
+            self._handle_validation_failure_followup_locked(result)
+
+    def _handle_validation_failure_followup_locked(self, result: Dict) -> None:
         try:
             src = result.get("source_file") or {}
             gdrive_file_id = src.get("gdrive_id")
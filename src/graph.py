@@ -154,6 +154,7 @@ class Workflow():
             lambda state: state.get("discord_state", {}).get("payment_status", "pending"),
             {
                 "completed": END,
+                "failed": END,
                 "pending": END
             }
         )
@@ -300,6 +300,8 @@ class Nodes:
             
             # Collect freshly uploaded PDF attachments to kick off immediate processing
             files_to_process: List[Dict[str, str]] = []
+            # Attachment rows, stored together in one transaction after the uploads
+            attachment_rows: List[tuple] = []
             
             for attachment in current_email.attachments:
                 # Upload attachment directly to Google Drive
@@ -324,8 +326,7 @@ class Nodes:
                         'gdrive_folder_id': gdrive_folder_id
                     }
                     
-                    # Store attachment info in database
-                    self.email_db.store_attachment(current_email.id, attachment_info)
+                    attachment_rows.append((current_email.id, attachment_info))
                     processed_attachments.append(attachment_info)
                     print(Fore.GREEN + f"✓ {upload_result['message']}" + Style.RESET_ALL)
                     
@@ -340,6 +341,10 @@ class Nodes:
                 else:
                     print(Fore.RED + f"✗ {upload_result['message']}" + Style.RESET_ALL)
             
+            # Store attachment info in database
+            if attachment_rows:
+                self.email_db.store_attachments_bulk(attachment_rows)
+            
             # Kick off processing for the uploaded PDFs immediately (non-blocking)
             if files_to_process:
                 try:
@@ -449,18 +454,12 @@ class Nodes:
         self.email_db.store_email(email_data)
         
         # Get the stored email to check invoice status
-        import sqlite3
-        with sqlite3.connect(self.email_db.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT is_invoice_related FROM emails WHERE id = ?', (current_email.id,))
-            result = cursor.fetchone()
-            
-            if result and result[0]:
-                print(Fore.GREEN + "Email is invoice-related!" + Style.RESET_ALL)
-                return "invoice_related"
-            else:
-                print(Fore.BLUE + "Email is not invoice-related" + Style.RESET_ALL)
-                return "not_invoice_related"
+        if self.email_db.is_invoice_related(current_email.id):
+            print(Fore.GREEN + "Email is invoice-related!" + Style.RESET_ALL)
+            return "invoice_related"
+        else:
+            print(Fore.BLUE + "Email is not invoice-related" + Style.RESET_ALL)
+            return "not_invoice_related"
     
     def check_all_emails_processed(self, state: BaseGraph) -> str:
         """Check if all emails have been processed."""
@@ -585,74 +584,83 @@ class Nodes:
             try:
                 now_iso = datetime.now().isoformat()
                 due = self.email_db.get_due_followups(now_iso)
-                for f in due:
-                    # First detect if requester has replied since initial notice
-                    thread_id = f.get("thread_id")
-                    initial_iso = f.get("initial_notice_sent_at") or ""
-                    try:
-                        initial_ts_ms = int(datetime.fromisoformat(initial_iso).timestamp() * 1000)
-                    except Exception:
-                        initial_ts_ms = None
-                    replied = False
-                    msgs = self.gmail_tools.get_thread_messages(thread_id) if thread_id else []
-                    for m in msgs:
-                        from_addr = (m.get("from") or "").lower()
-                        internal_ms = m.get("internalDate")
-                        if internal_ms and initial_ts_ms and internal_ms > initial_ts_ms:
-                            # Treat as reply if not from our own mailbox
-                            if my_email and my_email in from_addr:
-                                continue
-                            replied = True
-                            break
-                    if replied:
-                        try:
-                            self.email_db.mark_followup_resolved(f["id"])
-                            print(Fore.GREEN + f"✓ Detected reply for follow-up {f['id']}, marked resolved" + Style.RESET_ALL)
-                        except Exception as e:
-                            print(Fore.YELLOW + f"⚠️ Failed marking follow-up resolved: {e}" + Style.RESET_ALL)
+                # Reminders sent this tick, marked in one transaction once the batch is done
+                sent_ids: List[int] = []
+                try:
+                    self._send_due_followup_reminders(due, my_email, sent_ids)
+                finally:
+                    self.email_db.mark_followups_reminder_sent_bulk(sent_ids, datetime.now().isoformat())
+                time.sleep(max(60, poll_seconds))
+            except Exception as loop_e:
+                print(Fore.YELLOW + f"⚠️ Follow-up scheduler loop error: {loop_e}" + Style.RESET_ALL)
+                time.sleep(120)
+
+    def _send_due_followup_reminders(self, due: List[Dict[str, Any]], my_email: str, sent_ids: List[int]) -> None:
+        """Resolve replied follow-ups and send one reminder for the rest, appending reminded ids to sent_ids."""
+        for f in due:
+            # First detect if requester has replied since initial notice
+            thread_id = f.get("thread_id")
+            initial_iso = f.get("initial_notice_sent_at") or ""
+            try:
+                initial_ts_ms = int(datetime.fromisoformat(initial_iso).timestamp() * 1000)
+            except Exception:
+                initial_ts_ms = None
+            replied = False
+            msgs = self.gmail_tools.get_thread_messages(thread_id) if thread_id else []
+            for m in msgs:
+                from_addr = (m.get("from") or "").lower()
+                internal_ms = m.get("internalDate")
+                if internal_ms and initial_ts_ms and internal_ms > initial_ts_ms:
+                    # Treat as reply if not from our own mailbox
+                    if my_email and my_email in from_addr:
                         continue
+                    replied = True
+                    break
+            if replied:
+                try:
+                    self.email_db.mark_followup_resolved(f["id"])
+                    print(Fore.GREEN + f"✓ Detected reply for follow-up {f['id']}, marked resolved" + Style.RESET_ALL)
+                except Exception as e:
+                    print(Fore.YELLOW + f"⚠️ Failed marking follow-up resolved: {e}" + Style.RESET_ALL)
+                continue
 
-                    # If no reply and reminder not sent, send one reminder
-                    if not f.get("reminder_sent", 0):
+            # If no reply and reminder not sent, send one reminder
+            if not f.get("reminder_sent", 0):
+                try:
+                    email_row = self.email_db.get_email_by_id(f["email_id"])
+                    if email_row:
+                        initial_email = Email(
+                            id=email_row["id"],
+                            threadId=email_row["thread_id"],
+                            messageId=email_row.get("message_id") or "",
+                            references=email_row.get("email_references") or "",
+                            sender=email_row["sender"],
+                            subject=email_row["subject"],
+                            body=email_row["body"],
+                            attachments=[]
+                        )
                         try:
-                            email_row = self.email_db.get_email_by_id(f["email_id"])
-                            if email_row:
-                                initial_email = Email(
-                                    id=email_row["id"],
-                                    threadId=email_row["thread_id"],
-                                    messageId=email_row.get("message_id") or "",
-                                    references=email_row.get("email_references") or "",
-                                    sender=email_row["sender"],
-                                    subject=email_row["subject"],
-                                    body=email_row["body"],
-                                    attachments=[]
-                                )
+                            import json as _json
+                            missing_fields = []
+                            raw = f.get("missing_fields")
+                            if raw:
                                 try:
-                                    import json as _json
-                                    missing_fields = []
-                                    raw = f.get("missing_fields")
-                                    if raw:
-                                        try:
-                                            parsed = _json.loads(raw)
-                                            if isinstance(parsed, list):
-                                                missing_fields = parsed
-                                            elif isinstance(parsed, dict):
-                                                missing_fields = [f"{k}: {v}" for k, v in parsed.items()]
-                                        except Exception:
-                                            missing_fields = [str(raw)]
-                                    msg = self._compose_missing_info_email(missing_fields, email_row["subject"], is_reminder=True)
+                                    parsed = _json.loads(raw)
+                                    if isinstance(parsed, list):
+                                        missing_fields = parsed
+                                    elif isinstance(parsed, dict):
+                                        missing_fields = [f"{k}: {v}" for k, v in parsed.items()]
                                 except Exception:
-                                    msg = self._compose_missing_info_email([], email_row["subject"], is_reminder=True)
+                                    missing_fields = [str(raw)]
+                            msg = self._compose_missing_info_email(missing_fields, email_row["subject"], is_reminder=True)
+                        except Exception:
+                            msg = self._compose_missing_info_email([], email_row["subject"], is_reminder=True)
 
-                                self.gmail_tools.send_reply(initial_email, msg)
-                                self.email_db.mark_followup_reminder_sent(f["id"], datetime.now().isoformat())
-                                print(Fore.CYAN + f"Sent reminder for follow-up {f['id']}" + Style.RESET_ALL)
-                        except Exception as e:
-                            print(Fore.YELLOW + f"⚠️ Failed to send reminder for follow-up {f.get('id')}: {e}" + Style.RESET_ALL)
-                time.sleep(max(60, poll_seconds))
-            except Exception as loop_e:
-                print(Fore.YELLOW + f"⚠️ Follow-up scheduler loop error: {loop_e}" + Style.RESET_ALL)
-                time.sleep(120)
+                        self.gmail_tools.send_reply(initial_email, msg)
+                        sent_ids.append(f["id"])
+                        print(Fore.CYAN + f"Sent reminder for follow-up {f['id']}" + Style.RESET_ALL)
+                except Exception as e:
+                    print(Fore.YELLOW + f"⚠️ Failed to send reminder for follow-up {f.get('id')}: {e}" + Style.RESET_ALL)
 
     def _handle_validation_failure(self, result: Dict[str, Any], file_meta: Dict[str, Any]) -> None:
         """Draft and send a single consolidated email to the requestor listing required info. Create follow-up record and schedule one reminder."""
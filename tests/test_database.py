@@ -0,0 +1,82 @@
+import time
+
+from src.database import EmailDatabase
+
+
+def _email(email_id, subject="Hello", body="Just saying hi"):
+    return {
+        "id": email_id,
+        "threadId": f"t-{email_id}",
+        "messageId": f"<{email_id}@example.com>",
+        "references": "",
+        "sender": "vendor@example.com",
+        "subject": subject,
+        "body": body,
+    }
+
+
+def _attachment(name):
+    return {
+        "filename": name,
+        "original_filename": name,
+        "mime_type": "application/pdf",
+        "file_path": f"gdrive://{name}",
+        "gdrive_file_id": f"file-{name}",
+    }
+
+
+def test_store_attachments_bulk_flags_owning_email(tmp_path):
+    db = EmailDatabase(str(tmp_path / "db" / "emails.db"))
+    try:
+        db.store_email(_email("e1"))
+        db.store_email(_email("e2"))
+
+        assert db.store_attachments_bulk([("e1", _attachment("a.pdf")), ("e1", _attachment("b.pdf"))])
+
+        with db._tx() as conn:
+            flags = dict(conn.execute("SELECT id, has_attachments FROM emails").fetchall())
+            count = conn.execute("SELECT COUNT(*) FROM attachments WHERE email_id = 'e1'").fetchone()[0]
+        assert flags == {"e1": 1, "e2": 0}
+        assert count == 2
+    finally:
+        db.close()
+
+
+def _slow_classifier(db, monkeypatch, delay=0.2):
+    """Make background classification slow enough that an unsynchronized read would see NULL."""
+    detect = db._detect_invoice_keywords
+
+    def slow(subject, body=''):
+        time.sleep(delay)
+        return detect(subject, body)
+
+    monkeypatch.setattr(db, "_detect_invoice_keywords", slow)
+
+
+def test_get_email_by_id_waits_for_classification(tmp_path, monkeypatch):
+    db = EmailDatabase(str(tmp_path / "db" / "emails.db"))
+    try:
+        _slow_classifier(db, monkeypatch)
+        db.store_email(_email("e1", subject="Invoice #1234", body="Amount due: $50.00"))
+
+        row = db.get_email_by_id("e1")
+
+        assert row["is_invoice_related"] == 1
+        assert "invoice" in row["invoice_keywords"]
+    finally:
+        db.close()
+
+
+def test_get_email_by_gdrive_file_id_waits_for_classification(tmp_path, monkeypatch):
+    db = EmailDatabase(str(tmp_path / "db" / "emails.db"))
+    try:
+        _slow_classifier(db, monkeypatch)
+        db.store_email(_email("e1", subject="Hello", body="Just saying hi"))
+        db.store_attachment("e1", _attachment("a.pdf"))
+
+        row = db.get_email_by_gdrive_file_id("file-a.pdf")
+
+        assert row["id"] == "e1"
+        assert row["is_invoice_related"] == 0
+    finally:
+        db.close()
@@ -0,0 +1,83 @@
+import pytest
+
+discord1 = pytest.importorskip("discord1")
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Transferred, TX: ABC123456", "ABC123456"),
+    ("Wire sent yesterday REF: XY998877", "XY998877"),
+    ("payments done TX ABC12345", "ABC12345"),
+    ("TXID: ABCDEF123", "ABCDEF123"),
+    ("paid 0x" + "ab" * 32 + " REF: XY998877", "0x" + "ab" * 32),
+    ("ZQ12345678", "ZQ12345678"),
+])
+def test_extract_transaction_id_prefers_labelled_reference(message, expected):
+    assert discord1._extract_transaction_id(message) == expected
+
+
+def test_extract_transaction_id_none_without_reference():
+    assert discord1._extract_transaction_id("paid, thanks") is None
+
+
+@pytest.mark.parametrize("message", [
+    "TXID:ABCDEF12",
+    "payments done",
+    "Reference attached",
+    "completed",
+])
+def test_payment_keyword_is_substring_match(message):
+    assert discord1._has_payment_keyword(message)
+
+
+def test_payment_keyword_absent():
+    assert not discord1._has_payment_keyword("looks good to me")
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("approve, looks good", "looks good"),
+    ("APPROVE CC 123", "CC 123"),
+    ("approve: CC-42.", "CC-42"),
+    ("APPROVE", None),
+])
+def test_fast_parse_approve_takes_rest_of_line_as_cost_center(message, expected):
+    agent = object.__new__(discord1.InvoiceApprovalAgent)
+    parsed = agent._fast_parse_intent(message)
+    assert parsed["intent"] == "approve"
+    assert parsed["cost_center"] == expected
+
+
+@pytest.fixture
+def cached_agent():
+    agent = object.__new__(discord1.InvoiceApprovalAgent)
+    agent._state_cache = discord1.OrderedDict()
+    agent._state_cache_max = 8
+    agent._state_cache_lock = discord1.threading.Lock()
+    return agent
+
+
+def _approved_state():
+    return {
+        "invoice_data": {"Invoice Number": "INV-1"},
+        "approval_status": "approved",
+        "payment_status": "pending",
+        "approver": "alice",
+        "cost_center": "CC 123",
+    }
+
+
+def test_cached_state_has_no_embed_key(cached_agent):
+    cached_agent._cache_put_state("INV-1", _approved_state())
+    assert cached_agent._cache_get_state("INV-1") == _approved_state()
+
+
+def test_status_embed_timestamp_is_rendered_per_reply(cached_agent, monkeypatch):
+    state = dict(_approved_state(), approval_status="pending", approval_sla_hours=24)
+    state["invoice_data"] = {"Invoice Number": "INV-1", "Timestamp": "2024-01-01T00:00:00"}
+    monkeypatch.setattr(discord1, "_fmt_now", lambda: "cached-time")
+    cached_agent._cache_put_state("INV-1", state)
+    monkeypatch.setattr(discord1, "_fmt_now", lambda: "reply-time")
+    first = cached_agent._status_embed(cached_agent._cache_get_state("INV-1"))
+    second = cached_agent._status_embed(cached_agent._cache_get_state("INV-1"))
+    assert first.footer.text == "Last updated: reply-time"
+    # The pending countdown field is added per reply, not accumulated in the cached embed
+    assert len(first.fields) == len(second.fields)
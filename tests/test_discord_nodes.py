@@ -0,0 +1,156 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+import pytest
+
+discord_nodes = pytest.importorskip("src.discord_nodes")
+
+
+def _invoice_state(invoice_number="INV-1"):
+    return {
+        "invoice_processing_result": {
+            "status": "completed",
+            "data": {"invoice_number": invoice_number, "vendor_name": "ACME", "total_amount": 10},
+        }
+    }
+
+
+@pytest.fixture
+def failing_agent(monkeypatch):
+    """Enabled DiscordNodes whose agent submission fails shortly after it is made, storing no state."""
+    monkeypatch.delenv("DISCORD_THREAD_WAIT_SECONDS", raising=False)
+    monkeypatch.setattr(discord_nodes, "_discord_configured", lambda: True)
+    monkeypatch.setattr(discord_nodes, "ensure_started", lambda: None)
+    monkeypatch.setattr(discord_nodes, "add_state_listener", lambda callback: None)
+
+    def submit_invoice(payload):
+        fut = concurrent.futures.Future()
+        threading.Timer(0.2, fut.set_exception, (RuntimeError("post failed"),)).start()
+        return fut
+
+    monkeypatch.setattr(discord_nodes, "submit_invoice", submit_invoice)
+
+    def make():
+        nodes = discord_nodes.DiscordNodes()
+        nodes._fetch_state_from_db = lambda invoice_number: None
+        return nodes
+
+    return make
+
+
+def test_async_submission_failure_auto_approves(monkeypatch, failing_agent):
+    monkeypatch.setenv("DISCORD_AUTO_APPROVE_ON_FAILURE", "true")
+    nodes = failing_agent()
+
+    started = time.monotonic()
+    state = nodes.create_discord_thread(_invoice_state())
+
+    # The default bounded wait sees the failed submission (woken by its done callback, not the timeout)
+    assert time.monotonic() - started < nodes.thread_wait_seconds
+    assert state["discord_state"]["approval_status"] == "approved"
+    assert state["discord_state"]["approver"] == "system"
+    assert "INV-1" not in nodes._submissions
+
+
+def test_async_submission_failure_stays_pending_without_auto_approve(monkeypatch, failing_agent):
+    monkeypatch.setenv("DISCORD_AUTO_APPROVE_ON_FAILURE", "false")
+    nodes = failing_agent()
+
+    state = nodes.create_discord_thread(_invoice_state())
+
+    assert state["discord_state"]["approval_status"] == "pending"
+    assert state["discord_state"].get("approver") is None
+    assert "INV-1" not in nodes._submissions
+
+
+@pytest.fixture
+def agent_loop(monkeypatch):
+    """Stand-in for the agent's background event loop behind run_coroutine."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(discord_nodes, "run_coroutine", lambda coro: asyncio.run_coroutine_threadsafe(coro, loop))
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+@pytest.fixture
+def enabled_nodes(monkeypatch):
+    monkeypatch.setattr(discord_nodes, "_discord_configured", lambda: True)
+    monkeypatch.setattr(discord_nodes, "ensure_started", lambda: None)
+    monkeypatch.setattr(discord_nodes, "add_state_listener", lambda callback: None)
+    return discord_nodes.DiscordNodes()
+
+
+def test_wait_for_discord_approval_wakes_on_state_write(agent_loop, enabled_nodes):
+    nodes = enabled_nodes
+    nodes.wait_seconds = 10
+    rows = {}
+    nodes._fetch_state_from_db = lambda invoice_number: rows.get(invoice_number)
+
+    def approve():
+        rows["INV-1"] = {"approval_status": "approved", "payment_status": "pending", "invoice_data": {}}
+        nodes._on_state_written("INV-1")
+
+    threading.Timer(0.2, approve).start()
+    started = time.monotonic()
+    state = nodes.wait_for_discord_approval(_invoice_state())
+
+    # Woken by the write notification, well before the first 1s re-poll
+    assert time.monotonic() - started < 0.9
+    assert state["discord_state"]["approval_status"] == "approved"
+
+
+def test_wait_for_payment_confirmation_skips_settled_payment(agent_loop, enabled_nodes):
+    nodes = enabled_nodes
+    nodes._fetch_state_from_db = lambda invoice_number: pytest.fail("settled payment should not be re-read")
+    state = _invoice_state()
+    state["discord_state"] = {"approval_status": "approved", "payment_status": "completed"}
+
+    assert nodes.wait_for_payment_confirmation(state)["discord_state"]["payment_status"] == "completed"
+
+
+def test_agent_state_cache_evicts_least_recent(monkeypatch, enabled_nodes):
+    nodes = enabled_nodes
+    monkeypatch.setattr(nodes, "_STATE_CACHE_MAX", 2)
+    fields = [("approval_status", 1)]
+
+    def build(invoice_number):
+        return nodes._state_from_row((invoice_number, "pending", None), fields, 0, 2)
+
+    first = build("INV-1")
+    build("INV-2")
+    assert build("INV-1") is first  # hit refreshes INV-1
+    build("INV-3")
+
+    assert list(nodes._agent_state_cache) == ["INV-1", "INV-3"]
+
+
+def test_concurrent_sync_waiters_are_all_woken(enabled_nodes):
+    nodes = enabled_nodes
+    rows = {}
+    nodes._fetch_state_from_db = lambda invoice_number: rows.get(invoice_number)
+    approved = lambda agent_state: bool(agent_state) and agent_state["approval_status"] == "approved"
+    results = []
+
+    def wait():
+        results.append(nodes._wait_for_state("INV-1", approved, timeout=10))
+
+    waiters = [threading.Thread(target=wait) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    time.sleep(0.2)
+    rows["INV-1"] = {"approval_status": "approved"}
+    started = time.monotonic()
+    nodes._on_state_written("INV-1")
+    for waiter in waiters:
+        waiter.join(5)
+
+    # Both woken by the one write notification; a missed waiter would sleep until its 1s re-poll
+    assert time.monotonic() - started < 0.5
+    assert results == [{"approval_status": "approved"}] * 2
+    assert nodes._state_events == {}